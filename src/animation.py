@@ -0,0 +1,56 @@
+"""Linha do tempo de animações com poucos envios ao cliente.
+
+Em vez de mudar uma carta e chamar update() de cada vez, as mudanças são
+marcadas numa Timeline com o momento em que devem acontecer (em ms). As
+mudanças com o mesmo momento, arredondado a `frame` ms, formam um keyframe:
+todas as propriedades do keyframe são mudadas e enviadas num só update. A
+reprodução corre numa tarefa assíncrona (page.run_task), por isso o handler
+que a começa devolve logo e a sessão continua a responder aos eventos.
+
+    timeline = Timeline()
+    timeline.at(0, card, top=10, left=20)
+    page.run_task(timeline.play, flush)
+"""
+
+import asyncio
+
+TIMELINE_FRAME = 50  # ms; mudanças mais próximas do que isto vão no mesmo update
+
+
+class Timeline:
+    __slots__ = ("frame", "keyframes")
+
+    def __init__(self, frame=TIMELINE_FRAME):
+        self.frame = frame
+        self.keyframes = {}  # momento (ms) -> [(control, propriedades)]
+
+    def __len__(self):
+        """Número de keyframes, ou seja de updates que a reprodução vai enviar"""
+        return len(self.keyframes)
+
+    def at(self, ms, control, **properties):
+        moment = round(ms / self.frame) * self.frame
+        self.keyframes.setdefault(moment, []).append((control, properties))
+
+    async def play(self, flush, cancelled=None):
+        """Aplica cada keyframe no seu momento e chama flush(controls) uma vez por keyframe
+        (se flush for uma função async, espera por ela).
+
+        `cancelled()` é consultado antes de cada keyframe; se devolver True a
+        reprodução pára sem mexer em mais nada.
+        """
+        elapsed = 0
+        for moment in sorted(self.keyframes):
+            if moment > elapsed:
+                await asyncio.sleep((moment - elapsed) / 1000)
+                elapsed = moment
+            if cancelled is not None and cancelled():
+                return False
+            controls = []
+            for control, properties in self.keyframes[moment]:
+                for name, value in properties.items():
+                    setattr(control, name, value)
+                controls.append(control)
+            if asyncio.iscoroutine(result := flush(controls)):
+                await result
+        return True
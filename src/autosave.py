@@ -0,0 +1,61 @@
+"""Gravação automática depois das jogadas.
+
+Depois de cada jogada a sessão chama AUTOSAVER.mark(), que só anota a hora
+em que a gravação deve acontecer: SOLITAIRE_AUTOSAVE_DELAY segundos depois da
+última jogada (várias jogadas rápidas dão uma só gravação), mas nunca mais de
+AUTOSAVE_MAX_DELAY segundos depois da primeira. A sessão guarda uma cópia do
+estado no fim de cada jogada; a serialização dessa cópia e a escrita (store
+do servidor ou armazenamento do cliente) correm na thread do Autosaver, nunca
+nos handlers do arrasto. SOLITAIRE_AUTOSAVE_DELAY=0 desliga.
+"""
+
+import os
+import threading
+import time
+
+AUTOSAVE_DELAY = float(os.environ.get("SOLITAIRE_AUTOSAVE_DELAY", 2.0))  # segundos
+AUTOSAVE_MAX_DELAY = 10.0
+AUTOSAVE_TICK = 0.25
+
+
+class Autosaver:
+    def __init__(self, delay=AUTOSAVE_DELAY, max_delay=AUTOSAVE_MAX_DELAY, tick=AUTOSAVE_TICK):
+        self.delay = delay
+        self.max_delay = max_delay
+        self.tick = tick
+        self.due = {}  # sessão -> (hora da gravação, hora da primeira jogada por gravar)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def mark(self, solitaire):
+        """Marca a sessão como alterada; chamado nos handlers, por isso só mexe num dicionário"""
+        if not self.delay:
+            return
+        now = time.monotonic()
+        with self.lock:
+            _, first = self.due.get(solitaire, (None, now))
+            self.due[solitaire] = (min(now + self.delay, first + self.max_delay), first)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+                self.thread.start()
+
+    def ready(self, now=None):
+        """Tira da fila as sessões cuja gravação já está na hora"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            sessions = [s for s, (due, _) in self.due.items() if due <= now]
+            for solitaire in sessions:
+                del self.due[solitaire]
+        return sessions
+
+    def run(self):
+        while True:
+            time.sleep(self.tick)
+            for solitaire in self.ready():
+                try:
+                    solitaire.autosave()
+                except Exception as e:  # por exemplo uma sessão que já fechou
+                    print(f"Erro no autosave: {e!r}")
+
+
+AUTOSAVER = Autosaver()
@@ -0,0 +1,407 @@
+"""Benchmarks das interações principais, sem browser.
+
+Solitaire, Card e Slot correm contra uma FakePage que regista cada update():
+quantas chamadas, quantos controls mudaram e uma estimativa dos bytes enviados
+(JSON das propriedades que mudaram desde o update anterior, como no protocolo
+de diferenças do Flet). O tempo de cada cenário não inclui o trabalho da
+FakePage.
+
+    python benchmark.py --output antes.json
+    python benchmark.py --output depois.json --compare antes.json
+
+O relatório inclui também a memória de uma sessão (tracemalloc): montada, com
+MEMORY_MOVES jogadas no histórico e depois de MEMORY_RESTARTS reinícios; serve
+para estimar quantas ligações cabem numa máquina (`--memory` mostra só isso).
+
+`--cold-start` mede o arranque a frio: o tempo desde o início de um processo
+Python novo até ao primeiro tabuleiro jogável (imports, Solitaire e a primeira
+distribuição), como numa máquina que o Fly acabou de acordar.
+
+Com --compare o programa termina com código 1 se algum cenário ficar mais
+lento do que --threshold vezes o valor de referência.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+os.environ.setdefault("SOLITAIRE_STATS", "")  # os jogos dos benchmarks não contam nas estatísticas
+
+from solitaire import CARD_BACKS, Solitaire
+
+BENCHMARK_VERSION = 1
+BENCHMARK_SEED = 1234  # todas as medições partem da mesma distribuição
+BENCHMARK_REPEAT = 5
+DRAG_CARDS = 10
+DRAG_EVENTS = 20  # eventos de arrasto por carta
+UNDO_MOVES = 10
+MEMORY_MOVES = 200
+MEMORY_RESTARTS = 20
+COLD_START_RUNS = 5
+
+# Corre num processo novo: imprime os tempos quando o primeiro tabuleiro está pronto
+COLD_START_CHILD = """
+import json, time
+start = time.perf_counter()
+from benchmark import FakePage
+from solitaire import Solitaire
+imported = time.perf_counter()
+page = FakePage(track_payload=False)
+page.add(Solitaire())
+ready = time.perf_counter()
+print(json.dumps({"imports_ms": (imported - start) * 1000, "mount_ms": (ready - imported) * 1000}), flush=True)
+"""
+
+
+def control_attrs(control):
+    """Propriedades do control como o Flet as guarda ({nome: valor})"""
+    attrs = getattr(control, "_Control__attrs", None) or {}
+    return {name: value[0] if isinstance(value, tuple) else value for name, value in attrs.items()}
+
+
+def payload_size(attrs):
+    return len(json.dumps(attrs, default=str, separators=(",", ":")))
+
+
+class FakeClientStorage(dict):
+    def get(self, key):
+        return super().get(key)
+
+    def set(self, key, value):
+        self[key] = value
+        return True
+
+    def remove(self, key):
+        self.pop(key, None)
+
+    def contains_key(self, key):
+        return key in self
+
+
+class FakePage:
+    """Página sem cliente: regista os update() em vez de os enviar"""
+
+    def __init__(self, track_payload=True):
+        self.track_payload = track_payload  # sem isto não guarda as propriedades enviadas (para medir memória)
+        self.controls = []
+        self.client_storage = FakeClientStorage()
+        self.dialog = None
+        self.snack_bar = None
+        self.snapshots = {}  # id(control) -> propriedades enviadas no último update
+        self.tasks = []  # (função async, argumentos) agendados com run_task; não corre nenhum
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.updates = 0
+        self.changed_controls = 0
+        self.payload_bytes = 0
+        self.seconds = 0.0
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+        self.update(*controls)
+        for control in controls:
+            control.did_mount()
+
+    def run_task(self, handler, *args):
+        self.tasks.append((handler, args))
+
+    def update(self, *controls):
+        start = time.perf_counter()
+        if not controls:
+            controls = self.controls + [c for c in (self.dialog, self.snack_bar) if c is not None]
+        self.updates += 1
+        seen = set()
+        for control in controls:
+            self.send(control, seen)
+        self.seconds += time.perf_counter() - start
+
+    def send(self, control, seen):
+        stack = [control]
+        while stack:
+            control = stack.pop()
+            if id(control) in seen:
+                continue
+            seen.add(id(control))
+            control.page = self
+            stack.extend(control._get_children())
+            if not self.track_payload:
+                continue
+            attrs = control_attrs(control)
+            previous = self.snapshots.get(id(control))
+            if previous is None:
+                changed = attrs
+            else:
+                changed = {name: value for name, value in attrs.items() if previous.get(name) != value}
+            if changed or previous is None:
+                self.changed_controls += 1
+                self.payload_bytes += payload_size(changed)
+            self.snapshots[id(control)] = attrs
+
+
+def mounted_game(track_payload=True):
+    page = FakePage(track_payload)
+    solitaire = Solitaire()
+    page.add(solitaire)
+    solitaire.deal_cards(BENCHMARK_SEED)
+    page.reset_counters()
+    return page, solitaire
+
+
+def face_up_cards(solitaire):
+    """Cartas que o jogador pode arrastar, tirando cartas do stock se for preciso"""
+    cards = [slot.pile[-1] for slot in solitaire.tableau if slot.pile and slot.pile[-1].face_up]
+    while len(cards) < DRAG_CARDS and solitaire.stock.pile:
+        solitaire.stock.pile[-1].click(None)
+        cards.append(solitaire.waste.pile[-1])
+    return cards[:DRAG_CARDS]
+
+
+# Cada cenário recebe (page, solitaire) já montados, prepara o que precisa e
+# devolve (função a medir, número de operações)
+
+def scenario_mount(page, solitaire):
+    return lambda: page.add(Solitaire()), 1
+
+
+def scenario_deal(page, solitaire):
+    return lambda: solitaire.deal_cards(BENCHMARK_SEED), 1
+
+
+def scenario_drag(page, solitaire):
+    cards = face_up_cards(solitaire)
+    events = [SimpleNamespace(delta_x=3, delta_y=4) for _ in range(DRAG_EVENTS)]
+
+    def run():
+        for card in cards:
+            card.start_drag(None)
+            for event in events:
+                card.drag(event)
+            card.drop(None)
+
+    return run, len(cards)
+
+
+def scenario_undo(page, solitaire):
+    for _ in range(UNDO_MOVES):
+        solitaire.stock.pile[-1].click(None)
+
+    def run():
+        for _ in range(UNDO_MOVES):
+            solitaire.undo_move(None)
+
+    return run, UNDO_MOVES
+
+
+def scenario_save(page, solitaire):
+    return lambda: solitaire.save_game(None), 1
+
+
+def scenario_load(page, solitaire):
+    solitaire.save_game(None)
+    return lambda: solitaire.load_game(None), 1
+
+
+def scenario_card_back(page, solitaire):
+    _, image_name = CARD_BACKS[1]
+    return lambda: solitaire.set_card_back(image_name), 1
+
+
+def scenario_restart(page, solitaire):
+    return lambda: solitaire.restart_game(None), 1
+
+
+SCENARIOS = {
+    "mount": scenario_mount,
+    "deal": scenario_deal,
+    "drag": scenario_drag,
+    "undo": scenario_undo,
+    "save_game": scenario_save,
+    "load_game": scenario_load,
+    "set_card_back": scenario_card_back,
+    "restart_game": scenario_restart,
+}
+
+
+def measure(scenario, repeat=BENCHMARK_REPEAT):
+    timings = []
+    for _ in range(repeat):
+        page, solitaire = mounted_game()
+        run, operations = scenario(page, solitaire)
+        page.reset_counters()
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start - page.seconds) * 1000)
+    return {
+        "ms_median": round(statistics.median(timings), 3),
+        "ms_min": round(min(timings), 3),
+        "operations": operations,
+        "updates": page.updates,
+        "changed_controls": page.changed_controls,
+        "payload_bytes": page.payload_bytes,
+    }
+
+
+def session_memory():
+    """KiB alocados por uma sessão: montada, com histórico e depois de vários reinícios"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        page, solitaire = mounted_game(track_payload=False)
+        gc.collect()
+        mounted = tracemalloc.get_traced_memory()[0] - base
+        for _ in range(MEMORY_MOVES):
+            if solitaire.stock.pile:
+                solitaire.stock.pile[-1].click(None)
+            else:
+                solitaire.restart_stock()
+        gc.collect()
+        with_history = tracemalloc.get_traced_memory()[0] - base
+        for _ in range(MEMORY_RESTARTS):
+            solitaire.restart_game(None)
+        gc.collect()
+        after_restarts = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return {
+        "mounted_kib": round(mounted / 1024, 1),
+        "with_history_kib": round(with_history / 1024, 1),
+        "after_restarts_kib": round(after_restarts / 1024, 1),
+    }
+
+
+def cold_start(runs=COLD_START_RUNS):
+    """Mediana (ms) do arranque de um processo novo até ao primeiro tabuleiro, e a divisão do tempo"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    totals, details = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        child = subprocess.Popen(
+            [sys.executable, "-c", COLD_START_CHILD], cwd=here, stdout=subprocess.PIPE, text=True
+        )
+        line = child.stdout.readline()
+        totals.append((time.perf_counter() - start) * 1000)
+        child.wait()
+        details.append(json.loads(line))
+    return {
+        "ms_median": round(statistics.median(totals), 1),
+        "ms_min": round(min(totals), 1),
+        "imports_ms": round(statistics.median(d["imports_ms"] for d in details), 1),
+        "mount_ms": round(statistics.median(d["mount_ms"] for d in details), 1),
+    }
+
+
+def print_cold_start(result):
+    print(
+        f"arranque a frio {result['ms_median']:.0f} ms até ao primeiro tabuleiro "
+        f"(imports {result['imports_ms']:.0f} ms, montagem {result['mount_ms']:.0f} ms)"
+    )
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "-C", os.path.dirname(os.path.abspath(__file__)), "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names=None, repeat=BENCHMARK_REPEAT):
+    results = {}
+    for name in names or SCENARIOS:
+        results[name] = measure(SCENARIOS[name], repeat)
+        r = results[name]
+        print(
+            f"{name:14} {r['ms_median']:9.2f} ms  {r['updates']:4} updates  "
+            f"{r['changed_controls']:5} controls  {r['payload_bytes']:8} bytes"
+        )
+    memory = session_memory()
+    print_memory(memory)
+    startup = cold_start()
+    print_cold_start(startup)
+    return {
+        "version": BENCHMARK_VERSION,
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": repeat,
+        "results": results,
+        "memory": memory,
+        "cold_start": startup,
+    }
+
+
+def print_memory(memory):
+    print(
+        f"memória/sessão {memory['mounted_kib']:.0f} KiB montada, {memory['with_history_kib']:.0f} KiB "
+        f"com {MEMORY_MOVES} jogadas, {memory['after_restarts_kib']:.0f} KiB depois de {MEMORY_RESTARTS} reinícios"
+    )
+
+
+def compare(report, baseline, threshold):
+    """Mostra as diferenças para a referência; devolve os cenários que pioraram"""
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["ms_median"] / base["ms_median"] if base["ms_median"] else 1.0
+        print(
+            f"{name:14} {ratio:6.2f}x tempo  updates {base['updates']} -> {result['updates']}  "
+            f"bytes {base['payload_bytes']} -> {result['payload_bytes']}"
+        )
+        if ratio > threshold or result["updates"] > base["updates"]:
+            regressions.append(name)
+    if "cold_start" in baseline:
+        before, after = baseline["cold_start"]["ms_median"], report["cold_start"]["ms_median"]
+        print(f"{'arranque':14} {before:.0f} ms -> {after:.0f} ms")
+    if "memory" in baseline:
+        before, after = baseline["memory"]["with_history_kib"], report["memory"]["with_history_kib"]
+        print(f"{'memória':14} {before:.0f} KiB -> {after:.0f} KiB por sessão")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks das interações do jogo sem browser")
+    parser.add_argument("scenarios", nargs="*", help=f"por omissão todos: {', '.join(SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=BENCHMARK_REPEAT)
+    parser.add_argument("--output", default="benchmark.json", help="ficheiro JSON com os resultados")
+    parser.add_argument("--compare", help="resultados de referência (JSON) para comparar")
+    parser.add_argument("--memory", action="store_true", help="mede só a memória por sessão")
+    parser.add_argument("--cold-start", action="store_true", help="mede só o arranque a frio")
+    parser.add_argument("--threshold", type=float, default=1.2, help="razão de tempo a partir da qual há regressão")
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(unknown)}")
+
+    if args.memory:
+        print_memory(session_memory())
+        sys.exit(0)
+    if args.cold_start:
+        print_cold_start(cold_start())
+        sys.exit(0)
+
+    report = run_benchmarks(args.scenarios, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("Regressões: " + ", ".join(regressions))
+            sys.exit(1)
@@ -0,0 +1,182 @@
+"""Gera versões otimizadas das faces das cartas.
+
+As SVG originais trazem metadados do Inkscape, ids sem uso e números com muitas
+casas decimais. Este script escreve em assets/images/faces/:
+
+- SVG minificadas (sem metadados nem espaços, números arredondados);
+- opcionalmente PNG/WebP pré-rasterizados em várias densidades
+  (precisa de `cairosvg` e, para WebP e atlas, de `Pillow`);
+- opcionalmente um atlas com as 52 faces;
+- manifest.json, que Card usa (via faces.py) para encontrar cada ficheiro.
+
+Os nomes dos ficheiros incluem o hash do conteúdo, por isso podem ficar em
+cache no browser para sempre.
+
+    python build_assets.py                     # só SVG minificadas
+    python build_assets.py --raster png,webp --scales 1,2 --atlas
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from model import RANKS, SUITES
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "images")
+FACES_DIR = os.path.join(IMAGES_DIR, "faces")
+MANIFEST_PATH = os.path.join(FACES_DIR, "manifest.json")
+FACE_WIDTH = 70  # tamanho da carta no ecrã (CARD_WIDTH x CARD_HEIGTH em card.py)
+FACE_HEIGHT = 100
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+EDITOR_NAMESPACES = (
+    "http://www.inkscape.org/namespaces/inkscape",
+    "http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd",
+    "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "http://creativecommons.org/ns#",
+    "http://purl.org/dc/elements/1.1/",
+)
+NUMBER = re.compile(r"-?\d*\.\d+(?:[eE][-+]?\d+)?")
+REFERENCE = re.compile(r"#([\w.:-]+)")
+
+ET.register_namespace("", SVG_NS)
+ET.register_namespace("xlink", XLINK_NS)
+
+
+def face_names():
+    for suite_name, _ in SUITES:
+        for rank_name, _ in RANKS:
+            yield f"{rank_name}_{suite_name}"
+
+
+def namespace(tag):
+    return tag[1:].split("}")[0] if tag.startswith("{") else ""
+
+
+def round_numbers(value, precision):
+    def shorten(match):
+        text = f"{float(match.group()):.{precision}f}".rstrip("0").rstrip(".")
+        return "0" if text in ("", "-0") else text
+
+    return NUMBER.sub(shorten, value)
+
+
+def minify_svg(data, precision=2):
+    root = ET.fromstring(data)
+
+    references = set()
+    for element in root.iter():
+        for name, value in element.attrib.items():
+            if name != "id":
+                references.update(REFERENCE.findall(value))
+
+    for parent in list(root.iter()):
+        for child in list(parent):
+            if namespace(child.tag) in EDITOR_NAMESPACES or child.tag == f"{{{SVG_NS}}}metadata":
+                parent.remove(child)
+
+    for element in root.iter():
+        for name in list(element.attrib):
+            if namespace(name) in EDITOR_NAMESPACES:
+                del element.attrib[name]
+            elif name == "id" and element.attrib[name] not in references:
+                del element.attrib[name]
+            else:
+                element.attrib[name] = round_numbers(element.attrib[name], precision)
+        if element.text is not None and not element.text.strip():
+            element.text = None
+        if element.tail is not None and not element.tail.strip():
+            element.tail = None
+
+    return ET.tostring(root, encoding="utf-8")
+
+
+def write_hashed(name, extension, data):
+    """Escreve `data` com o hash no nome e devolve o caminho usado pelo cliente"""
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    filename = f"{name}.{digest}.{extension}"
+    with open(os.path.join(FACES_DIR, filename), "wb") as f:
+        f.write(data)
+    return f"/images/faces/{filename}"
+
+
+def rasterize(svg_data, scale, image_format):
+    import cairosvg  # dependência opcional, só para a rasterização
+
+    png = cairosvg.svg2png(bytestring=svg_data, output_width=FACE_WIDTH * scale, output_height=FACE_HEIGHT * scale)
+    if image_format == "png":
+        return png
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.open(io.BytesIO(png)).save(output, format="WEBP", quality=90, method=6)
+    return output.getvalue()
+
+
+def build_atlas(rasters, scale, image_format):
+    """Junta as faces numa grelha de 13 x 4; devolve (dados, posições)"""
+    from PIL import Image
+
+    width, height = FACE_WIDTH * scale, FACE_HEIGHT * scale
+    atlas = Image.new("RGBA", (width * len(RANKS), height * len(SUITES)))
+    rects = {}
+    for index, name in enumerate(face_names()):
+        x, y = (index % len(RANKS)) * width, (index // len(RANKS)) * height
+        atlas.paste(Image.open(io.BytesIO(rasters[name])), (x, y))
+        rects[name] = [x, y, width, height]
+    output = io.BytesIO()
+    atlas.save(output, format="WEBP" if image_format == "webp" else "PNG", optimize=True)
+    return output.getvalue(), rects
+
+
+def build(precision=2, raster_formats=(), scales=(1,), atlas=False):
+    os.makedirs(FACES_DIR, exist_ok=True)
+    for filename in os.listdir(FACES_DIR):
+        os.remove(os.path.join(FACES_DIR, filename))
+
+    manifest = {"svg": {}, "raster": {}, "atlas": {}}
+    original_size = minified_size = 0
+    minified = {}
+    for name in face_names():
+        with open(os.path.join(IMAGES_DIR, f"{name}.svg"), "rb") as f:
+            data = f.read()
+        minified[name] = minify_svg(data, precision)
+        original_size += len(data)
+        minified_size += len(minified[name])
+        manifest["svg"][name] = write_hashed(name, "svg", minified[name])
+
+    for image_format in raster_formats:
+        for scale in scales:
+            key = f"{image_format}@{scale}x"
+            rasters = {name: rasterize(minified[name], scale, image_format) for name in face_names()}
+            manifest["raster"][key] = {
+                name: write_hashed(f"{name}@{scale}x", image_format, data) for name, data in rasters.items()
+            }
+            if atlas:
+                data, rects = build_atlas(rasters, scale, image_format)
+                manifest["atlas"][key] = {"src": write_hashed(f"atlas@{scale}x", image_format, data), "rects": rects}
+
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=1)
+    print(f"SVG: {original_size / 1024:.0f} KiB -> {minified_size / 1024:.0f} KiB")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Otimiza as imagens das faces das cartas")
+    parser.add_argument("--precision", type=int, default=2, help="casas decimais nas SVG")
+    parser.add_argument("--raster", default="", help="formatos rasterizados, por exemplo png,webp")
+    parser.add_argument("--scales", default="1,2", help="densidades para os formatos rasterizados")
+    parser.add_argument("--atlas", action="store_true", help="gera também um atlas por formato/densidade")
+    args = parser.parse_args()
+    build(
+        args.precision,
+        [f for f in args.raster.split(",") if f],
+        [int(s) for s in args.scales.split(",") if s],
+        args.atlas,
+    )
@@ -1,23 +1,82 @@
+import asyncio
+import os
+import time
+
 import flet as ft
+from faces import face_src
+from slot import STOCK_SLOT, TABLEAU_SLOT, WASTE_SLOT
 
 CARD_WIDTH = 70
 CARD_HEIGTH = 100
 DROP_PROXIMITY = 30
 CARD_OFFSET = 20
+DRAG_UPDATE_RATE = 30  # máximo de atualizações por segundo enviadas durante o arrasto
+DRAG_METER = os.environ.get("SOLITAIRE_DRAG_METER", "0") != "0"  # mostra as atualizações/s do último arrasto
+
+
+class DragMeter:
+    """Limita e conta as atualizações enviadas ao cliente durante o arrasto"""
+
+    def __init__(self):
+        self.last_flush = 0.0
+        self.drag_start = 0.0
+        self.drag_flushes = 0
+        self.events = 0
+        self.flushes = 0
+        self.rate = 0.0  # atualizações por segundo conseguidas no último arrasto
+        self.dragging = False
+        self.pending = False  # há posições do arrasto que ainda não foram enviadas
+        self.trailing = False  # já há um envio final agendado
+
+    def start(self):
+        """Começa a medir um arrasto; o tempo parado entre arrastos não conta"""
+        self.drag_start = time.monotonic()
+        self.drag_flushes = 0
+        self.dragging = True
+        self.pending = False
+
+    def due(self, update_rate):
+        """Regista um evento de arrasto e diz se já passou o intervalo entre envios"""
+        self.events += 1
+        due = time.monotonic() - self.last_flush >= 1 / update_rate
+        self.pending = not due
+        return due
+
+    def schedule_trailing(self, update_rate):
+        """Segundos até ao envio final de um evento que ficou por enviar, ou None se já está agendado"""
+        if self.trailing:
+            return None
+        self.trailing = True
+        return max(0.0, 1 / update_rate - (time.monotonic() - self.last_flush))
+
+    def flushed(self):
+        self.pending = False
+        self.last_flush = time.monotonic()
+        self.flushes += 1
+        self.drag_flushes += 1
+
+    def finish(self):
+        """Calcula a taxa do arrasto que acabou, mesmo que tenha durado menos de um segundo"""
+        self.dragging = False
+        elapsed = time.monotonic() - self.drag_start
+        if elapsed > 0:
+            self.rate = self.drag_flushes / elapsed
 
 
 class Card(ft.GestureDetector):
-    def __init__(self, solitaire, suite, rank):
+    def __init__(self, solitaire, suite, rank, code):
         super().__init__()
         self.mouse_cursor = ft.MouseCursor.MOVE
         self.drag_interval = 5
-        self.on_pan_start = self.start_drag
-        self.on_pan_update = self.drag
-        self.on_pan_end = self.drop
-        self.on_tap = self.click
-        self.on_double_tap = self.doubleclick
+        self.drag_update_rate = DRAG_UPDATE_RATE
+        self.on_pan_start = solitaire.handler("card.start_drag", self.start_drag)
+        self.on_pan_update = solitaire.handler("card.drag", self.drag)
+        self.on_pan_end = solitaire.handler("card.drop", self.drop)
+        self.on_tap = solitaire.handler("card.click", self.click)
+        self.on_double_tap = solitaire.handler("card.doubleclick", self.doubleclick)
         self.suite = suite
         self.rank = rank
+        self.code = code
         self.face_up = False
         self.top = None
         self.left = None
@@ -28,63 +87,73 @@ class Card(ft.GestureDetector):
             width=CARD_WIDTH,
             height=CARD_HEIGTH,
             border_radius=ft.border_radius.all(6),
-            content=ft.Image(src="/images/card_back.png"),
+            content=ft.Image(src=solitaire.card_back_image),
         )
         
         self.draggable_pile = [self]
 
+    def set_face(self, face_up):
+        """Muda a imagem da carta sem atualizar a interface"""
+        self.face_up = face_up
+        if face_up:
+            self.content.content.src = face_src(self.rank.name, self.suite.name)
+        else:
+            self.content.content.src = self.solitaire.card_back_image
+
     def turn_face_up(self):
         """Reveals card"""
-        self.face_up = True
-        self.content.content.src = f"/images/{self.rank.name}_{self.suite.name}.svg"
+        self.set_face(True)
         self.solitaire.update()
 
     def turn_face_down(self):
         """Vira a carta para baixo com a imagem de fundo atual"""
-        self.face_up = False
-        self.content.content.src = self.solitaire.card_back_image  # Usa a imagem salva
+        self.set_face(False)  # Usa a imagem salva
 
         # Verifica se a carta está na interface antes de atualizar
         if self.page:
-            self.page.update()  # Atualiza a interface toda, evitando erro
+            self.solitaire.update()
 
     def move_on_top(self):
         """Brings draggable card pile to the top of the stack"""
-
-        for card in self.draggable_pile:
-            self.solitaire.controls.remove(card)
-            self.solitaire.controls.append(card)
-        self.solitaire.update()
+        # Se a pilha já está no topo não há nada para enviar
+        if self.solitaire.layers.raise_to_top(self.draggable_pile):
+            self.solitaire.update()
 
     def bounce_back(self):
         """Returns draggable pile to its original position"""
         for card in self.draggable_pile:
-            if card.slot in self.solitaire.tableau:
-                card.top = card.slot.top + card.slot.pile.index(card) * CARD_OFFSET
-            else:
-                card.top = card.slot.top
+            card.top = card.slot.card_top(card.index)
             card.left = card.slot.left
         self.solitaire.update()
 
     def place(self, slot):
         """Place draggable pile to the slot"""
+        # O histórico, a verificação de vitória e o update ficam para o fim da transação
+        with self.solitaire.batch():
+            self.solitaire.record(
+                self.solitaire.state.move(self.slot.pile_id, slot.pile_id, len(self.draggable_pile))
+            )
+            self.position_pile(slot)
 
-        for card in self.draggable_pile:
-            # Define a posição vertical da carta
-            if slot in self.solitaire.tableau:
-                # Para slots do tableau, empilha as cartas com um offset
-                card.top = slot.top + len(slot.pile) * CARD_OFFSET
+    def position_pile(self, slot):
+        """Move a pilha arrastada para o slot na interface"""
+        # A pilha arrastada é sempre o topo do slot original: corta-se pela posição da carta
+        old_slot = self.slot
+        if old_slot is not None:
+            if old_slot.pile[self.index:] == self.draggable_pile:
+                del old_slot.pile[self.index:]
             else:
-                # Para outros slots, coloca as cartas na mesma posição vertical
-                card.top = slot.top
-            card.left = slot.left
+                print(f"Warning: Card {self.rank.name} {self.suite.name} is not on top of its previous slot's pile.")
+                for card in self.draggable_pile:
+                    if card in old_slot.pile:
+                        old_slot.pile.remove(card)
+                for index, card in enumerate(old_slot.pile):
+                    card.index = index
 
-            # Remove a carta do slot original, se existir
-            if card.slot is not None:
-                if card in card.slot.pile:  # Verifica se a carta está na pilha do slot anterior
-                    card.slot.pile.remove(card)
-                else:
-                    print(f"Warning: Card {card.rank.name} {card.suite.name} not found in previous slot's pile.")
+        for card in self.draggable_pile:
+            # Nos slots do tableau as cartas ficam empilhadas com um offset
+            card.top = slot.card_top(len(slot.pile))
+            card.left = slot.left
 
             # Atualiza o slot da carta para o novo slot
             card.slot = slot
@@ -93,49 +162,61 @@ class Card(ft.GestureDetector):
             slot.pile.append(card)
             card.index = len(slot.pile) - 1
 
-        # Verifica se o jogo foi vencido
-        if self.solitaire.check_win():
-            self.solitaire.winning_sequence()
-
-        # Atualiza a interface e salva o estado do jogo
-        self.solitaire.update()
-        self.solitaire.save_state()
-
     def get_draggable_pile(self):
         """
         Retorna a lista de cartas que serão arrastadas a partir da carta atual.
-        Se a carta não for encontrada na pile do slot, assume que é sozinha.
+        Usa a posição guardada na carta (card.index), sem procurar na pile.
         """
-        if self.slot is not None and self.slot not in (self.solitaire.stock, self.solitaire.waste):
-            try:
-                idx = self.slot.pile.index(self)
-            except ValueError:
-                idx = 0
-            self.draggable_pile = self.slot.pile[idx:]
+        if self.slot is not None and self.slot.kind not in (STOCK_SLOT, WASTE_SLOT):
+            self.draggable_pile = self.slot.pile[self.index:]
         else:
             self.draggable_pile = [self]
 
 
     def start_drag(self, e: ft.DragStartEvent):
         if self.face_up:
+            self.solitaire.drag_meter.start()
             self.get_draggable_pile()
             self.move_on_top()
 
     def drag(self, e: ft.DragUpdateEvent):
         if self.face_up:
-            for card in self.draggable_pile:
-                card.top = (
-                    max(0, self.top + e.delta_y)
-                    + self.draggable_pile.index(card) * CARD_OFFSET
-                )
-                card.left = max(0, self.left + e.delta_x)
-                self.solitaire.update()
+            top = max(0, self.top + e.delta_y)
+            left = max(0, self.left + e.delta_x)
+            for offset, card in enumerate(self.draggable_pile):
+                card.top = top + offset * CARD_OFFSET
+                card.left = left
+
+            # Só as cartas arrastadas são enviadas, no máximo drag_update_rate vezes por segundo.
+            # Se o ponteiro parar dentro do intervalo, a última posição vai num envio
+            # agendado; a posição final é sempre enviada em drop (place ou bounce_back).
+            meter = self.solitaire.drag_meter
+            if meter.due(self.drag_update_rate):
+                self.page.update(*self.draggable_pile)
+                meter.flushed()
+            elif (delay := meter.schedule_trailing(self.drag_update_rate)) is not None:
+                self.page.run_task(self.trailing_update, delay)
+
+    async def trailing_update(self, delay):
+        await asyncio.sleep(delay)
+        await asyncio.to_thread(self.flush_trailing)
+
+    # Corre numa thread, com o lock dos handlers, para não bloquear o event loop
+    def flush_trailing(self):
+        meter = self.solitaire.drag_meter
+        with self.solitaire.hibernation_lock:
+            meter.trailing = False
+            if meter.dragging and meter.pending and self.solitaire.hibernated is None:
+                self.page.update(*self.draggable_pile)
+                meter.flushed()
 
     def drop(self, e: ft.DragEndEvent):
         if self.face_up:
+            self.solitaire.drag_meter.finish()
+            self.solitaire.show_drag_rate()
             for slot in self.solitaire.tableau:
                 if (
-                    abs(self.top - (slot.top + len(slot.pile) * CARD_OFFSET))
+                    abs(self.top - slot.card_top(len(slot.pile)))
                     < DROP_PROXIMITY
                     and abs(self.left - slot.left) < DROP_PROXIMITY
                 ) and self.solitaire.check_tableau_rules(self, slot):
@@ -154,23 +235,28 @@ class Card(ft.GestureDetector):
             self.bounce_back()
 
     def click(self, e):
-        if self.slot in self.solitaire.tableau:
+        if self.slot.kind == TABLEAU_SLOT:
             if not self.face_up and self == self.slot.get_top_card():
+                # Como as outras jogadas: histórico, dica limpa e um só update no fim da transação
+                with self.solitaire.batch():
+                    self.solitaire.record(self.solitaire.state.flip(self.slot.pile_id))
+                    self.turn_face_up()
+        elif self.slot.kind == STOCK_SLOT:
+            self.draggable_pile = [self]
+            with self.solitaire.batch():
+                self.move_on_top()
+                self.place(self.solitaire.waste)
                 self.turn_face_up()
-        elif self.slot == self.solitaire.stock:
-            self.move_on_top()
-            self.place(self.solitaire.waste)
-            self.turn_face_up()
 
     def doubleclick(self, e):
         self.get_draggable_pile()
         if self.face_up and len(self.draggable_pile) == 1:
-            self.move_on_top()
-            for slot in self.solitaire.foundations:
-                if self.solitaire.check_foundations_rules(self, slot):
-                    self.place(slot)
-                    return
-                
+            dst = self.solitaire.state.foundation_for(self.code, self.slot.pile_id)
+            if dst is not None:
+                with self.solitaire.batch():
+                    self.move_on_top()
+                    self.place(self.solitaire.slots[dst])
+
     def get_snapshot(self):
         return  {
                 "suite": self.suite.name,
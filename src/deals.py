@@ -0,0 +1,152 @@
+"""Distribuições com semente e índice de distribuições com solução.
+
+Cada distribuição é reproduzível a partir da semente (deal_order). O gerador
+resolve sementes candidatas em paralelo num pool de processos e guarda as que
+têm solução, com o comprimento da solução como medida de dificuldade, em
+deals.json. Em jogo, DealIndex.draw escolhe uma semente em O(1) sem resolver
+nada.
+
+Gerar o índice:
+
+    python deals.py --count 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from model import DECK_SIZE, GameState
+from solver import SOLVED, Solver
+
+DEALS_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "deals.json")
+DEALS_INDEX_VERSION = 1
+
+# Dificuldade pelo número de jogadas da solução encontrada
+DIFFICULTIES = (
+    ("easy", "Fácil", 150),
+    ("medium", "Médio", 170),
+    ("hard", "Difícil", None),
+)
+
+
+def new_seed():
+    return random.getrandbits(32)
+
+
+def deal_order(seed):
+    """Ordem dos códigos das cartas para a semente dada"""
+    order = list(range(DECK_SIZE))
+    random.Random(seed).shuffle(order)
+    return order
+
+
+def dealt_state(seed):
+    state = GameState()
+    state.deal(deal_order(seed))
+    return state
+
+
+def difficulty_for(solution_length):
+    for name, _, max_length in DIFFICULTIES:
+        if max_length is None or solution_length <= max_length:
+            return name
+
+
+def solve_seed(seed, max_nodes, time_limit):
+    """Corre num processo do pool; devolve (semente, estado, comprimento da solução)"""
+    result = Solver(max_nodes, time_limit).solve(dealt_state(seed))
+    return seed, result.status, len(result.moves)
+
+
+class DealIndex:
+    def __init__(self, path=DEALS_INDEX_PATH):
+        self.path = path
+        self.deals = {name: [] for name, _, _ in DIFFICULTIES}  # dificuldade -> [[semente, jogadas], ...]
+        self.seeds = set()
+
+    @classmethod
+    def load(cls, path=DEALS_INDEX_PATH):
+        index = cls(path)
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == DEALS_INDEX_VERSION:
+                for name, entries in data["deals"].items():
+                    index.deals.setdefault(name, []).extend(entries)
+                    index.seeds.update(seed for seed, _ in entries)
+        return index
+
+    def __len__(self):
+        return len(self.seeds)
+
+    def add(self, seed, solution_length):
+        if seed not in self.seeds:
+            self.seeds.add(seed)
+            self.deals[difficulty_for(solution_length)].append([seed, solution_length])
+
+    def draw(self, difficulty=None):
+        """Semente com solução garantida (da dificuldade pedida), ou None se não houver"""
+        if difficulty is None:
+            pools = [entries for entries in self.deals.values() if entries]
+            if not pools:
+                return None
+            entries = random.choice(pools)
+        else:
+            entries = self.deals.get(difficulty)
+            if not entries:
+                return None
+        return random.choice(entries)[0]
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": DEALS_INDEX_VERSION, "deals": self.deals}, f)
+        os.replace(tmp_path, self.path)
+
+
+_index = None
+
+
+def get_index():
+    """Índice partilhado pelo processo, lido do disco na primeira utilização"""
+    global _index
+    if _index is None:
+        _index = DealIndex.load()
+    return _index
+
+
+def generate(count, start=0, workers=None, max_nodes=200_000, time_limit=5.0, path=DEALS_INDEX_PATH):
+    index = DealIndex.load(path)
+    seeds = [seed for seed in range(start, start + count) if seed not in index.seeds]
+    solved = 0
+    begin = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        results = pool.map(
+            solve_seed, seeds, [max_nodes] * len(seeds), [time_limit] * len(seeds), chunksize=4
+        )
+        for seed, status, length in results:
+            if status == SOLVED:
+                index.add(seed, length)
+                solved += 1
+    index.save()
+    elapsed = time.perf_counter() - begin
+    print(
+        f"{len(seeds)} sementes em {elapsed:.1f}s ({len(seeds) / elapsed if elapsed else 0:.1f}/s), "
+        f"{solved} com solução; índice com {len(index)} distribuições"
+    )
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera o índice de distribuições com solução")
+    parser.add_argument("--count", type=int, default=1000, help="número de sementes a testar")
+    parser.add_argument("--start", type=int, default=0, help="primeira semente")
+    parser.add_argument("--workers", type=int, default=None, help="processos (por omissão todos os núcleos)")
+    parser.add_argument("--max-nodes", type=int, default=200_000)
+    parser.add_argument("--time-limit", type=float, default=5.0, help="segundos por semente")
+    parser.add_argument("--output", default=DEALS_INDEX_PATH)
+    args = parser.parse_args()
+    generate(args.count, args.start, args.workers, args.max_nodes, args.time_limit, args.output)
@@ -0,0 +1,34 @@
+"""Caminho da imagem da face de cada carta.
+
+Por omissão usa as versões geradas por build_assets.py (assets/images/faces/
+manifest.json) quando existem, e as SVG originais caso contrário. A variável
+de ambiente SOLITAIRE_CARD_FACES escolhe o formato: "svg" (originais), "min"
+(SVG minificadas), "png@1x", "png@2x", "webp@2x", ... ou "auto".
+"""
+
+import json
+import os
+
+CARD_FACE_FORMAT = os.environ.get("SOLITAIRE_CARD_FACES", "auto")
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "images", "faces", "manifest.json")
+
+_sources = None
+
+
+def load_sources(face_format=CARD_FACE_FORMAT, manifest_path=MANIFEST_PATH):
+    """Dicionário nome da face -> caminho, ou None para usar as SVG originais"""
+    if face_format == "svg" or not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if face_format in ("auto", "min"):
+        return manifest["svg"]
+    return manifest["raster"].get(face_format) or manifest["svg"]
+
+
+def face_src(rank_name, suite_name):
+    global _sources
+    if _sources is None:
+        _sources = load_sources() or {}
+    name = f"{rank_name}_{suite_name}"
+    return _sources.get(name, f"/images/{name}.svg")
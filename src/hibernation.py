@@ -0,0 +1,62 @@
+"""Hibernação das sessões paradas.
+
+Um separador aberto e esquecido guarda no servidor as 52 cartas, os slots e o
+histórico. MONITOR verifica as sessões registadas de HIBERNATION_INTERVAL em
+HIBERNATION_INTERVAL segundos e, se uma não teve atividade durante
+SOLITAIRE_IDLE_TIMEOUT segundos, chama Solitaire.hibernate(): o jogo fica só
+na string compacta de GameState.encode e os controls são libertados. O
+próximo clique chama Solitaire.resume(), que volta a montar o tabuleiro com
+um só update. SOLITAIRE_IDLE_TIMEOUT=0 desliga a hibernação.
+
+A hibernação e os handlers de eventos da sessão (Solitaire.handler) usam o
+mesmo lock, e cada handler conta como atividade: uma sessão nunca hiberna a
+meio de um arrasto ou com um handler em curso.
+"""
+
+import os
+import threading
+import time
+import weakref
+
+IDLE_TIMEOUT = float(os.environ.get("SOLITAIRE_IDLE_TIMEOUT", 15 * 60))  # segundos
+HIBERNATION_INTERVAL = 30.0  # segundos entre verificações
+
+
+class HibernationMonitor:
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, interval=HIBERNATION_INTERVAL):
+        self.idle_timeout = idle_timeout
+        self.interval = interval
+        self.sessions = weakref.WeakSet()  # sessões fechadas desaparecem sozinhas
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def register(self, solitaire):
+        if not self.idle_timeout:
+            return
+        with self.lock:
+            self.sessions.add(solitaire)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="hibernation", daemon=True)
+                self.thread.start()
+
+    def unregister(self, solitaire):
+        with self.lock:
+            self.sessions.discard(solitaire)
+
+    def idle_sessions(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            sessions = list(self.sessions)
+        return [s for s in sessions if s.hibernated is None and now - s.last_activity >= self.idle_timeout]
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            for solitaire in self.idle_sessions():
+                try:
+                    solitaire.hibernate(self.idle_timeout)
+                except Exception as e:  # uma sessão com problemas não pára o monitor
+                    print(f"Erro ao hibernar a sessão: {e!r}")
+
+
+MONITOR = HibernationMonitor()
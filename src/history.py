@@ -0,0 +1,56 @@
+"""Histórico de jogadas para desfazer/refazer.
+
+Em vez de copiar todas as pilhas a cada jogada, guarda só os Move aplicados
+(origem, destino, número de cartas, viragem e score) num buffer circular.
+Desfazer e refazer aplicam as jogadas ao contrário ou de novo, por isso o custo
+depende só das cartas movidas e a memória não cresce com a duração do jogo.
+"""
+
+from collections import deque
+
+HISTORY_LIMIT = 500  # número máximo de jogadas que se podem desfazer
+
+
+class MoveLog:
+    __slots__ = ("limit", "entries", "redo_entries")
+
+    def __init__(self, limit=HISTORY_LIMIT):
+        self.limit = limit
+        self.entries = deque(maxlen=limit)  # cada entrada é um tuplo de Move
+        self.redo_entries = deque(maxlen=limit)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def reset(self):
+        """Começa um jogo novo"""
+        self.entries.clear()
+        self.redo_entries.clear()
+
+    def record(self, moves):
+        """Guarda as jogadas de uma ação do jogador (já aplicadas ao estado)"""
+        moves = tuple(move for move in moves if move is not None)
+        if not moves:
+            return
+        self.entries.append(moves)
+        self.redo_entries.clear()
+
+    def undo(self, state):
+        """Reverte a última entrada em `state` e devolve-a (ou None)"""
+        if not self.entries:
+            return None
+        moves = self.entries.pop()
+        for move in reversed(moves):
+            state.revert(move)
+        self.redo_entries.append(moves)
+        return moves
+
+    def redo(self, state):
+        """Volta a aplicar a última entrada desfeita e devolve-a (ou None)"""
+        if not self.redo_entries:
+            return None
+        moves = self.redo_entries.pop()
+        for move in moves:
+            state.apply(move)
+        self.entries.append(moves)
+        return moves
@@ -0,0 +1,161 @@
+"""Instrumentação opcional das ações do jogador.
+
+Com SOLITAIRE_INSTRUMENTATION=1 os handlers de eventos (Card, Slot e botões de
+Solitaire) são embrulhados por instrumented(), que mede para cada ação:
+
+- o tempo do handler;
+- quantos update()/page.update() provocou (os update() dos controls passam
+  todos por page.update, que watch_page conta);
+- quantos controls iam nesses updates (o tamanho das subárvores enviadas, uma
+  estimativa por excesso do que o Flet manda depois de calcular as diferenças).
+
+As amostras ficam numa janela deslizante por ação (STATS), que se escreve num
+ficheiro JSON com dump() ou no log com log(); no servidor o sinal SIGUSR1 faz
+as duas coisas. Com SOLITAIRE_INSTRUMENTATION_OVERLAY=1 a última ação aparece
+também no ecrã, por baixo do score.
+
+Desligada, instrumented() devolve o próprio handler e watch_page() não faz
+nada: não há custo nenhum.
+"""
+
+import functools
+import json
+import os
+import signal
+import statistics
+import threading
+import time
+from collections import deque
+
+INSTRUMENTATION = os.environ.get("SOLITAIRE_INSTRUMENTATION", "0") != "0"
+INSTRUMENTATION_OVERLAY = INSTRUMENTATION and os.environ.get("SOLITAIRE_INSTRUMENTATION_OVERLAY", "0") != "0"
+INSTRUMENTATION_DUMP_PATH = os.environ.get("SOLITAIRE_INSTRUMENTATION_DUMP", "instrumentation.json")
+INSTRUMENTATION_WINDOW = 1000  # amostras guardadas por ação
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Action:
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.updates = 0
+        self.controls = 0
+
+
+class ActionStats:
+    """Janela deslizante de amostras (ms, updates, controls) por ação, partilhada pelas sessões"""
+
+    def __init__(self, window=INSTRUMENTATION_WINDOW):
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, ms, updates, controls):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append((ms, updates, controls))
+
+    def report(self):
+        with self.lock:
+            samples = {name: list(values) for name, values in self.samples.items()}
+        report = {}
+        for name, values in sorted(samples.items()):
+            times = sorted(ms for ms, _, _ in values)
+            histogram = dict.fromkeys([f"<={bucket}ms" for bucket in LATENCY_BUCKETS_MS] + ["mais"], 0)
+            for ms in times:
+                bucket = next((b for b in LATENCY_BUCKETS_MS if ms <= b), None)
+                histogram["mais" if bucket is None else f"<={bucket}ms"] += 1
+            report[name] = {
+                "count": len(values),
+                "ms_p50": round(times[len(times) // 2], 3),
+                "ms_p95": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+                "ms_max": round(times[-1], 3),
+                "updates_mean": round(statistics.mean(u for _, u, _ in values), 2),
+                "controls_mean": round(statistics.mean(c for _, _, c in values), 1),
+                "histogram": histogram,
+            }
+        return report
+
+    def dump(self, path=INSTRUMENTATION_DUMP_PATH):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=1)
+        return path
+
+    def log(self):
+        for name, entry in self.report().items():
+            print(
+                f"[instrumentação] {name:22} n={entry['count']:5} p50={entry['ms_p50']:7.2f} ms "
+                f"p95={entry['ms_p95']:7.2f} ms updates={entry['updates_mean']:5.2f} "
+                f"controls={entry['controls_mean']:6.1f}"
+            )
+
+    def clear(self):
+        with self.lock:
+            self.samples = {}
+
+
+STATS = ActionStats()
+_current = threading.local()  # ação em curso na thread do evento
+
+
+def instrumented(name, handler, on_done=None):
+    """Embrulha um handler de evento; `on_done(name, ms, updates, controls)` é chamado no fim"""
+    if not INSTRUMENTATION:
+        return handler
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        if getattr(_current, "action", None) is not None:
+            return handler(*args, **kwargs)  # chamado por outro handler: conta na ação exterior
+        action = _current.action = Action(name)
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            _current.action = None
+            ms = (time.perf_counter() - action.start) * 1000
+            STATS.add(name, ms, action.updates, action.controls)
+            if on_done is not None:
+                on_done(name, ms, action.updates, action.controls)
+
+    return wrapper
+
+
+def count_controls(control):
+    count = 0
+    stack = [control]
+    while stack:
+        control = stack.pop()
+        count += 1
+        stack.extend(control._get_children())
+    return count
+
+
+def watch_page(page):
+    """Conta os page.update() feitos durante cada ação"""
+    if not INSTRUMENTATION or getattr(page.update, "instrumented", False):
+        return
+    update = page.update
+
+    def counted_update(*controls):
+        action = getattr(_current, "action", None)
+        if action is not None:
+            action.updates += 1
+            action.controls += sum(count_controls(control) for control in controls or page.controls)
+        return update(*controls)
+
+    counted_update.instrumented = True
+    page.update = counted_update
+
+
+def install_signal_handler(path=INSTRUMENTATION_DUMP_PATH):
+    """SIGUSR1 escreve as estatísticas em `path` e no log"""
+    if not INSTRUMENTATION or not hasattr(signal, "SIGUSR1"):
+        return
+
+    def dump(signum, frame):
+        STATS.log()
+        print(f"[instrumentação] escrito em {STATS.dump(path)}")
+
+    signal.signal(signal.SIGUSR1, dump)
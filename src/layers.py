@@ -0,0 +1,49 @@
+"""Ordem de desenho (z-order) das cartas dentro do Stack do jogo.
+
+A ordem das cartas é guardada num dict (que mantém a ordem de inserção):
+subir k cartas para o topo custa O(k) e a lista de controls só é reescrita uma
+vez por alteração. Se as cartas já estão no topo nada muda, e o update seguinte
+não tem diferenças nos controls para enviar.
+"""
+
+from itertools import islice
+
+
+class CardLayers:
+    def __init__(self, stack):
+        self.stack = stack
+        self.order = {}  # carta -> None, de baixo para cima
+
+    def __len__(self):
+        return len(self.order)
+
+    def is_on_top(self, cards):
+        cards = list(cards)
+        return list(islice(reversed(self.order), len(cards)))[::-1] == cards
+
+    def raise_to_top(self, cards):
+        """Põe as cartas por cima de todas as outras, por esta ordem; devolve False se já estavam"""
+        cards = list(cards)
+        if self.is_on_top(cards):
+            return False
+        for card in cards:
+            self.order.pop(card, None)
+            self.order[card] = None
+        self.sync()
+        return True
+
+    def reset(self, cards):
+        """Substitui todas as cartas, pela ordem dada (de baixo para cima)"""
+        self.clear()
+        self.order = dict.fromkeys(cards)
+        self.stack.controls.extend(self.order)
+
+    def clear(self):
+        if self.order:
+            del self.stack.controls[-len(self.order):]
+        self.order = {}
+
+    def sync(self):
+        # As cartas ocupam sempre o fim da lista de controls, por cima dos slots e botões
+        controls = self.stack.controls
+        controls[len(controls) - len(self.order):] = self.order
@@ -1,4 +1,5 @@
 import flet as ft
+from instrumentation import install_signal_handler
 from solitaire import Solitaire
 
 
@@ -11,4 +12,7 @@ def main(page: ft.Page):
     page.add(solitaire)
 
 
-ft.app(target=main, assets_dir="assets")
+# O guard evita que os processos do solver (multiprocessing "spawn") voltem a arrancar a app
+if __name__ == "__main__":
+    install_signal_handler()
+    ft.app(target=main, assets_dir="assets")
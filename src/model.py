@@ -0,0 +1,398 @@
+"""Modelo do jogo independente do Flet.
+
+Cada carta é um inteiro pequeno (naipe * 13 + valor - 1) e cada pilha é um
+bytearray. O bit FACE_UP marca as cartas viradas para cima. Assim um jogo pode
+ser criado, copiado e verificado sem construir nenhum controlo da interface.
+"""
+
+import base64
+
+SUITES = (
+    ("hearts", "RED"),
+    ("diamonds", "RED"),
+    ("clubs", "BLACK"),
+    ("spades", "BLACK"),
+)
+RANKS = (
+    ("Ace", 1),
+    ("2", 2),
+    ("3", 3),
+    ("4", 4),
+    ("5", 5),
+    ("6", 6),
+    ("7", 7),
+    ("8", 8),
+    ("9", 9),
+    ("10", 10),
+    ("Jack", 11),
+    ("Queen", 12),
+    ("King", 13),
+)
+
+DECK_SIZE = 52
+CODE_MASK = 0x3F
+FACE_UP = 0x40
+
+# Índices das pilhas dentro de GameState.piles
+STOCK = 0
+WASTE = 1
+FOUNDATIONS = (2, 3, 4, 5)
+TABLEAU = (6, 7, 8, 9, 10, 11, 12)
+PILE_COUNT = 13
+ALL_PILES = frozenset(range(PILE_COUNT))
+
+# Formato guardado por GameState.encode: versão, score, tamanho de cada pilha e
+# os códigos das cartas (com o bit FACE_UP), tudo em base64 (~90 caracteres)
+SAVE_VERSION = 1
+
+
+def card_code(suite_index, rank_value):
+    return suite_index * 13 + rank_value - 1
+
+
+def suite_of(code):
+    return (code & CODE_MASK) // 13
+
+
+def rank_of(code):
+    return (code & CODE_MASK) % 13 + 1
+
+
+def is_red(code):
+    return suite_of(code) < 2
+
+
+def card_name(code):
+    return f"{RANKS[rank_of(code) - 1][0]} {SUITES[suite_of(code)][0]}"
+
+
+def move_score(dst):
+    """Ponto ganho por uma jogada para o tableau ou para uma fundação"""
+    return 1 if dst in TABLEAU or dst in FOUNDATIONS else 0
+
+
+class Move:
+    """Uma jogada: `count` cartas do topo de `src` para `dst`.
+
+    Uma jogada com `flip` vira para cima a carta do topo de `src` (count = 0).
+    """
+
+    # O histórico guarda centenas de jogadas por sessão: sem __dict__ cada uma ocupa menos de metade
+    __slots__ = ("src", "dst", "count", "flip", "score")
+
+    def __init__(self, src, dst, count=1, flip=False, score=0):
+        self.src = src
+        self.dst = dst
+        self.count = count
+        self.flip = flip
+        self.score = score
+
+    def __repr__(self):
+        if self.flip:
+            return f"Move(flip {self.src})"
+        return f"Move({self.src} -> {self.dst} x{self.count}, score {self.score:+d})"
+
+
+class GameState:
+    __slots__ = ("piles", "score", "foundation_cards", "hidden_cards")
+
+    def __init__(self, piles=None, score=0):
+        if piles is None:
+            piles = [bytearray() for _ in range(PILE_COUNT)]
+        self.piles = piles
+        self.score = score
+        self.count_cards()
+
+    def count_cards(self):
+        """Recalcula os contadores mantidos por apply/revert (só para piles vindas de fora)"""
+        self.foundation_cards = sum(len(self.piles[pile_id]) for pile_id in FOUNDATIONS)
+        self.hidden_cards = sum(
+            1 for pile_id in TABLEAU for code in self.piles[pile_id] if not code & FACE_UP
+        )
+
+    def copy(self):
+        state = GameState.__new__(GameState)
+        state.piles = [bytearray(pile) for pile in self.piles]
+        state.score = self.score
+        state.foundation_cards = self.foundation_cards
+        state.hidden_cards = self.hidden_cards
+        return state
+
+    def key(self):
+        """Representação imutável do tabuleiro (sem o score)."""
+        return b"/".join(bytes(pile) for pile in self.piles)
+
+    def __eq__(self, other):
+        return isinstance(other, GameState) and self.piles == other.piles and self.score == other.score
+
+    def encode(self):
+        """Texto compacto com o estado (as posições no ecrã não são guardadas)"""
+        return base64.urlsafe_b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def decode(cls, text):
+        """Inverso de encode; levanta ValueError se o texto não for um jogo válido"""
+        try:
+            data = base64.urlsafe_b64decode(text.encode("ascii"))
+        except (ValueError, UnicodeEncodeError) as error:
+            raise ValueError("Jogo guardado inválido") from error
+        return cls.from_bytes(data)
+
+    def to_bytes(self):
+        data = bytearray([SAVE_VERSION])
+        data += self.score.to_bytes(2, "big", signed=True)
+        data += bytes(len(pile) for pile in self.piles)
+        for pile in self.piles:
+            data += pile
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data):
+        header = 3 + PILE_COUNT
+        if len(data) < header or data[0] != SAVE_VERSION:
+            raise ValueError("Versão do jogo guardado desconhecida")
+        score = int.from_bytes(data[1:3], "big", signed=True)
+        piles = []
+        offset = header
+        for length in data[3:header]:
+            piles.append(bytearray(data[offset:offset + length]))
+            offset += length
+        codes = sorted(code & CODE_MASK for pile in piles for code in pile)
+        if offset != len(data) or codes != list(range(DECK_SIZE)):
+            raise ValueError("Jogo guardado inválido")
+        return cls(piles, score)
+
+    def deal(self, order):
+        """Distribui as 52 cartas pela ordem dada, como Solitaire.deal_cards"""
+        for pile in self.piles:
+            pile.clear()
+        cards = iter(order)
+        for first_slot in range(len(TABLEAU)):
+            for pile_id in TABLEAU[first_slot:]:
+                self.piles[pile_id].append(next(cards) & CODE_MASK)
+        self.piles[STOCK].extend(code & CODE_MASK for code in cards)
+        for pile_id in TABLEAU:
+            self.piles[pile_id][-1] |= FACE_UP
+        self.score = 0
+        self.count_cards()
+
+    def top(self, pile_id):
+        pile = self.piles[pile_id]
+        if pile:
+            return pile[-1]
+        return None
+
+    def run_length(self, pile_id):
+        """Número de cartas viradas para cima no topo da pilha"""
+        pile = self.piles[pile_id]
+        count = 0
+        for code in reversed(pile):
+            if not code & FACE_UP:
+                break
+            count += 1
+        return count
+
+    def check_tableau_rules(self, code, dst):
+        top_card = self.top(dst)
+        if top_card is None:
+            return rank_of(code) == 13
+        return (
+            bool(top_card & FACE_UP)
+            and is_red(code) != is_red(top_card)
+            and rank_of(top_card) - rank_of(code) == 1
+        )
+
+    def check_foundations_rules(self, code, src, dst):
+        if src in FOUNDATIONS:
+            # A carta já estava numa fundação
+            return False
+        top_card = self.top(dst)
+        if top_card is None:
+            return rank_of(code) == 1
+        return suite_of(code) == suite_of(top_card) and rank_of(code) - rank_of(top_card) == 1
+
+    def foundation_for(self, code, src):
+        """Fundação que aceita a carta, ou None"""
+        if src in FOUNDATIONS:
+            return None
+        rank = rank_of(code)
+        suite = suite_of(code)
+        for dst in FOUNDATIONS:
+            pile = self.piles[dst]
+            if pile:
+                if suite_of(pile[-1]) == suite and rank_of(pile[-1]) == rank - 1:
+                    return dst
+            elif rank == 1:
+                return dst
+        return None
+
+    def is_legal(self, src, dst, count=1):
+        """Verifica se mover `count` cartas de `src` para `dst` respeita as regras"""
+        if src == dst or count < 1:
+            return False
+        pile = self.piles[src]
+        if count > len(pile):
+            return False
+        code = pile[-count]
+        if src == STOCK:
+            return dst == WASTE and count == 1
+        if dst == STOCK:
+            return src == WASTE and count == len(pile) and not self.piles[STOCK]
+        if dst == WASTE or not code & FACE_UP:
+            return False
+        if src in (WASTE,) + FOUNDATIONS and count != 1:
+            return False
+        if dst in FOUNDATIONS:
+            return count == 1 and self.check_foundations_rules(code, src, dst)
+        return self.check_tableau_rules(code, dst)
+
+    def is_won(self):
+        return self.foundation_cards == DECK_SIZE
+
+    def can_auto_finish(self):
+        """Sem stock, sem descarte e sem cartas escondidas: o resto vai todo para as fundações"""
+        return (
+            not self.piles[STOCK]
+            and not self.piles[WASTE]
+            and self.hidden_cards == 0
+            and self.foundation_cards < DECK_SIZE
+        )
+
+    def legal_moves(self):
+        """Lista todas as jogadas permitidas nesta posição"""
+        moves = []
+        for src in range(PILE_COUNT):
+            moves.extend(self.moves_from(src, ALL_PILES))
+        return moves
+
+    def moves_from(self, src, dests):
+        """Jogadas permitidas que saem de `src` e chegam a uma das pilhas `dests`"""
+        pile = self.piles[src]
+        if src == STOCK:
+            return [Move(STOCK, WASTE, 1)] if pile and WASTE in dests else []
+        if not pile:
+            return []
+        moves = []
+        if src == WASTE and STOCK in dests and not self.piles[STOCK]:
+            moves.append(Move(WASTE, STOCK, len(pile)))
+        if not pile[-1] & FACE_UP:
+            if src in dests:
+                moves.append(Move(src, src, 0, flip=True))
+            return moves
+        dst = self.foundation_for(pile[-1], src)
+        if dst is not None and dst in dests:
+            moves.append(Move(src, dst, 1, score=move_score(dst)))
+
+        # Numa sequência do tableau só uma carta pode servir a cada destino:
+        # a que tem o valor imediatamente abaixo do topo do destino (ou o Rei)
+        max_count = self.run_length(src) if src in TABLEAU else 1
+        top_rank = rank_of(pile[-1])
+        for dst in TABLEAU:
+            if dst == src or dst not in dests:
+                continue
+            dst_top = self.top(dst)
+            count = (13 if dst_top is None else rank_of(dst_top) - 1) - top_rank + 1
+            if 1 <= count <= max_count and self.check_tableau_rules(pile[-count], dst):
+                moves.append(Move(src, dst, count, score=move_score(dst)))
+        return moves
+
+    def move(self, src, dst, count=1):
+        """Aplica a jogada (sem validar) e devolve o Move correspondente"""
+        move = Move(src, dst, count, score=move_score(dst))
+        self.apply(move)
+        return move
+
+    def flip(self, pile_id):
+        """Vira para cima a carta do topo; devolve None se já estava virada"""
+        top_card = self.top(pile_id)
+        if top_card is None or top_card & FACE_UP:
+            return None
+        move = Move(pile_id, pile_id, 0, flip=True)
+        self.apply(move)
+        return move
+
+    def apply(self, move):
+        if move.flip:
+            self.piles[move.src][-1] |= FACE_UP
+            if move.src in TABLEAU:
+                self.hidden_cards -= 1
+            return
+        self._transfer(move.src, move.dst, move.count)
+        self.score += move.score
+
+    def revert(self, move):
+        if move.flip:
+            self.piles[move.src][-1] &= CODE_MASK
+            if move.src in TABLEAU:
+                self.hidden_cards += 1
+            return
+        self._transfer(move.dst, move.src, move.count)
+        self.score -= move.score
+
+    def _transfer(self, src, dst, count):
+        source = self.piles[src]
+        run = source[-count:]
+        del source[-count:]
+        self._push(dst, run)
+        # As cartas que entram ou saem do tableau estão sempre viradas para cima
+        if src in FOUNDATIONS:
+            self.foundation_cards -= count
+        if dst in FOUNDATIONS:
+            self.foundation_cards += count
+
+    def _push(self, pile_id, run):
+        # No stock as cartas ficam viradas para baixo, nas outras pilhas para cima
+        if pile_id == STOCK:
+            self.piles[pile_id].extend(code & CODE_MASK for code in run)
+        else:
+            self.piles[pile_id].extend(code | FACE_UP for code in run)
+
+
+class MoveGenerator:
+    """Jogadas permitidas de um GameState, guardadas por pilha de origem.
+
+    Depois de cada jogada só se recalculam as jogadas que saem das pilhas
+    tocadas ou que chegam a elas; as outras continuam válidas.
+    """
+
+    __slots__ = ("state", "by_source")
+
+    def __init__(self, state):
+        self.reset(state)
+
+    def reset(self, state=None):
+        if state is not None:
+            self.state = state
+        self.by_source = [self.state.moves_from(src, ALL_PILES) for src in range(PILE_COUNT)]
+
+    def copy(self, state):
+        """Gerador para `state`, uma cópia do estado deste gerador, sem recalcular nada"""
+        generator = MoveGenerator.__new__(MoveGenerator)
+        generator.state = state
+        generator.by_source = [list(moves) for moves in self.by_source]
+        return generator
+
+    def moves(self):
+        return [move for moves in self.by_source for move in moves]
+
+    def foundation_moves(self):
+        return [move for moves in self.by_source for move in moves if move.dst in FOUNDATIONS and not move.flip]
+
+    def update(self, moves):
+        """Atualiza depois de `moves` terem sido aplicadas ou revertidas no estado"""
+        touched = set()
+        for move in moves:
+            touched.add(move.src)
+            touched.add(move.dst)
+        if not touched:
+            return
+        if not touched.isdisjoint(FOUNDATIONS):
+            # Um Ás pode ir para qualquer fundação vazia: recalcula todas
+            touched.update(FOUNDATIONS)
+        for src in range(PILE_COUNT):
+            if src in touched:
+                self.by_source[src] = self.state.moves_from(src, ALL_PILES)
+            else:
+                kept = [move for move in self.by_source[src] if move.dst not in touched]
+                kept.extend(self.state.moves_from(src, touched))
+                self.by_source[src] = kept
@@ -0,0 +1,143 @@
+"""Gravação compacta de um jogo: a semente (ou a posição inicial) e as jogadas.
+
+Cada jogada ocupa um byte, origem << 4 | destino: o número de cartas e o score
+deduzem-se das regras na posição em que a jogada é feita (uma carta virada é
+origem == destino). Uma ação do jogador com várias jogadas marca as seguintes
+com JOIN; desfazer e refazer têm um byte próprio. Um jogo inteiro cabe em
+poucas centenas de bytes e exporta-se como texto (encode/decode)
+para reproduzir erros ou partilhar jogos.
+
+    record = GameRecord.from_seed(seed)
+    record.add_action(moves)
+    text = record.encode()
+    for kind, moves in GameRecord.decode(text).events(): ...
+"""
+
+import base64
+
+from deals import dealt_state
+from model import FACE_UP, PILE_COUNT, STOCK, TABLEAU, WASTE, GameState, Move, move_score, rank_of
+
+RECORD_VERSION = 1
+START_SEED = 0
+START_STATE = 1
+
+JOIN = 0xFC  # a jogada seguinte pertence à mesma ação
+REDO = 0xFD
+UNDO = 0xFE
+
+ACTION = "action"  # tipos de evento de GameRecord.events
+UNDO_EVENT = "undo"
+REDO_EVENT = "redo"
+
+
+class GameRecord:
+    __slots__ = ("seed", "start", "data")
+
+    def __init__(self, seed=None, start=None, data=None):
+        self.seed = seed  # semente da distribuição, ou None se o jogo começou de um GameState
+        self.start = start  # bytes de GameState.to_bytes quando não há semente
+        self.data = bytearray() if data is None else data
+
+    @classmethod
+    def from_seed(cls, seed):
+        return cls(seed=seed)
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(start=state.to_bytes())
+
+    def __len__(self):
+        return len(self.data)
+
+    def initial_state(self):
+        if self.seed is not None:
+            return dealt_state(self.seed)
+        return GameState.from_bytes(self.start)
+
+    def add_action(self, moves):
+        for index, move in enumerate(moves):
+            if index:
+                self.data.append(JOIN)
+            self.data.append(move.src << 4 | move.dst)
+
+    def add_undo(self):
+        self.data.append(UNDO)
+
+    def add_redo(self):
+        self.data.append(REDO)
+
+    def events(self):
+        """(ACTION, [(origem, destino), ...]), (UNDO_EVENT, None) ou (REDO_EVENT, None), por ordem"""
+        action = None
+        join = False
+        for byte in self.data:
+            if byte == JOIN:
+                join = True
+                continue
+            if byte in (UNDO, REDO):
+                if action:
+                    yield ACTION, action
+                action = None
+                yield (UNDO_EVENT if byte == UNDO else REDO_EVENT), None
+                continue
+            if action and not join:
+                yield ACTION, action
+                action = None
+            action = (action or []) + [(byte >> 4, byte & 0x0F)]
+            join = False
+        if action:
+            yield ACTION, action
+
+    def encode(self):
+        data = bytearray([RECORD_VERSION])
+        if self.seed is not None:
+            data.append(START_SEED)
+            data += self.seed.to_bytes(4, "big")
+        else:
+            data.append(START_STATE)
+            data.append(len(self.start))
+            data += self.start
+        data += self.data
+        return base64.urlsafe_b64encode(bytes(data)).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, text):
+        """Inverso de encode; levanta ValueError se o texto não for uma gravação"""
+        text = text.strip()
+        try:
+            data = base64.urlsafe_b64decode((text + "=" * (-len(text) % 4)).encode("ascii"))
+        except (ValueError, UnicodeEncodeError) as error:
+            raise ValueError("Gravação inválida") from error
+        if len(data) < 2 or data[0] != RECORD_VERSION:
+            raise ValueError("Versão da gravação desconhecida")
+        if data[1] == START_SEED and len(data) >= 6:
+            return cls(seed=int.from_bytes(data[2:6], "big"), data=bytearray(data[6:]))
+        if data[1] == START_STATE and len(data) >= 3 and len(data) >= 3 + data[2]:
+            start = bytes(data[3:3 + data[2]])
+            GameState.from_bytes(start)  # valida
+            return cls(start=start, data=bytearray(data[3 + data[2]:]))
+        raise ValueError("Gravação inválida")
+
+
+def decode_move(state, src, dst):
+    """Move completo para (origem, destino) na posição `state`; ValueError se não for permitido"""
+    if src >= PILE_COUNT or dst >= PILE_COUNT:
+        raise ValueError("Gravação inválida: pilha desconhecida")
+    if src == dst:
+        top = state.top(src)
+        if src in TABLEAU and top is not None and not top & FACE_UP:
+            return Move(src, src, 0, flip=True)
+        raise ValueError("Gravação inválida: carta que não se pode virar")
+    if src == WASTE and dst == STOCK:
+        count = len(state.piles[WASTE])
+    elif src in TABLEAU and dst in TABLEAU and state.piles[src]:
+        # Só uma carta da sequência pode ir para este destino: a que está logo abaixo do topo (ou o Rei)
+        dst_top = state.top(dst)
+        count = (13 if dst_top is None else rank_of(dst_top) - 1) - rank_of(state.piles[src][-1]) + 1
+    else:
+        count = 1
+    if not state.is_legal(src, dst, count):
+        raise ValueError("Gravação inválida: jogada não permitida")
+    return Move(src, dst, count, score=move_score(dst))
+
@@ -0,0 +1,171 @@
+"""Simulação de muitos jogos sem interface, para medir estratégias e distribuições.
+
+Joga N distribuições (sementes start .. start + N - 1) com as regras de
+model.py, espalhadas por todos os núcleos num pool de processos. Cada jogo
+terminado é escrito logo como uma linha JSON; no fim aparece o resumo com a
+taxa de vitórias, a média de jogadas e de score e os jogos por segundo.
+
+Estratégias:
+
+- random: uma jogada permitida qualquer (as cartas viradas para baixo viram-se sempre);
+- greedy: fundações primeiro, depois jogadas que destapam cartas, depois o stock;
+- solver: a solução do solver (solver.py), com o orçamento de --max-nodes/--time-limit.
+
+    python simulate.py --games 1000 --strategy greedy --output greedy.jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from deals import dealt_state
+from model import FACE_UP, FOUNDATIONS, STOCK, TABLEAU, WASTE, MoveGenerator
+from solver import SOLVED, Solver
+
+SIMULATION_MAX_MOVES = 1000  # um jogo que não acaba antes disto conta como perdido
+STRATEGIES = ("random", "greedy", "solver")
+
+
+def play_flips(state, generator):
+    moves = 0
+    for pile_id in TABLEAU:
+        move = state.flip(pile_id)
+        if move is not None:
+            generator.update([move])
+            moves += 1
+    return moves
+
+
+def play_random(state, seed, max_moves=SIMULATION_MAX_MOVES, **_):
+    rng = random.Random(seed)
+    generator = MoveGenerator(state)
+    moves = 0
+    while moves < max_moves and not state.is_won():
+        moves += play_flips(state, generator)
+        candidates = generator.moves()
+        if not candidates:
+            break
+        move = rng.choice(candidates)
+        state.apply(move)
+        generator.update([move])
+        moves += 1
+    return moves
+
+
+def greedy_rank(state, move):
+    """Prioridade de uma jogada para a estratégia greedy (menor é melhor), ou None para a ignorar"""
+    if move.dst in FOUNDATIONS:
+        return None if move.src in FOUNDATIONS else 0
+    if move.src in TABLEAU:
+        below = len(state.piles[move.src]) - move.count - 1
+        # Só vale a pena mexer no tableau para destapar uma carta
+        return 1 if below >= 0 and not state.piles[move.src][below] & FACE_UP else None
+    if move.src == WASTE and move.dst in TABLEAU:
+        return 2
+    if move.src == STOCK or move.dst == STOCK:
+        return 3
+    return None
+
+
+def play_greedy(state, seed, max_moves=SIMULATION_MAX_MOVES, **_):
+    generator = MoveGenerator(state)
+    moves = 0
+    recycles_without_progress = 0
+    while moves < max_moves and not state.is_won():
+        moves += play_flips(state, generator)
+        ranked = [(rank, move) for move in generator.moves() if (rank := greedy_rank(state, move)) is not None]
+        if not ranked:
+            break
+        _, move = min(ranked, key=lambda entry: entry[0])
+        if move.dst == STOCK:
+            recycles_without_progress += 1
+            if recycles_without_progress > 1:
+                break  # uma volta inteira ao stock sem nenhuma jogada útil
+        elif move.src != STOCK:
+            recycles_without_progress = 0
+        state.apply(move)
+        generator.update([move])
+        moves += 1
+    return moves
+
+
+def play_solver(state, seed, max_nodes=200_000, time_limit=5.0, **_):
+    result = Solver(max_nodes, time_limit).solve(state)
+    for move in result.moves:
+        state.apply(move)
+    return len(result.moves) if result.status == SOLVED else 0
+
+
+PLAYERS = {"random": play_random, "greedy": play_greedy, "solver": play_solver}
+
+
+def simulate_game(seed, strategy, options):
+    """Corre num processo do pool; devolve o resultado de um jogo"""
+    start = time.perf_counter()
+    state = dealt_state(seed)
+    moves = PLAYERS[strategy](state, seed, **options)
+    return {
+        "seed": seed,
+        "strategy": strategy,
+        "won": state.is_won(),
+        "moves": moves,
+        "score": state.score,
+        "foundation_cards": state.foundation_cards,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def simulate(games, strategy="greedy", start=0, workers=None, output=None, **options):
+    """Joga `games` jogos e escreve uma linha JSON por jogo em `output`; devolve o resumo"""
+    output = output or sys.stdout
+    seeds = range(start, start + games)
+    wins = total_moves = total_score = 0
+    begin = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        results = pool.map(
+            simulate_game, seeds, [strategy] * games, [options] * games, chunksize=max(1, min(64, games // 64))
+        )
+        for result in results:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            wins += result["won"]
+            total_moves += result["moves"]
+            total_score += result["score"]
+    elapsed = time.perf_counter() - begin
+    return {
+        "strategy": strategy,
+        "games": games,
+        "win_rate": round(wins / games, 4) if games else 0.0,
+        "avg_moves": round(total_moves / games, 1) if games else 0.0,
+        "avg_score": round(total_score / games, 1) if games else 0.0,
+        "games_per_sec": round(games / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Joga muitos jogos sem interface e mostra as estatísticas")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--strategy", choices=STRATEGIES, default="greedy")
+    parser.add_argument("--start", type=int, default=0, help="primeira semente")
+    parser.add_argument("--workers", type=int, default=None, help="processos (por omissão todos os núcleos)")
+    parser.add_argument("--max-moves", type=int, default=SIMULATION_MAX_MOVES, help="para random e greedy")
+    parser.add_argument("--max-nodes", type=int, default=200_000, help="para solver")
+    parser.add_argument("--time-limit", type=float, default=5.0, help="segundos por jogo, para solver")
+    parser.add_argument("--output", help="ficheiro JSONL (por omissão a saída padrão)")
+    args = parser.parse_args()
+
+    if args.strategy == "solver":
+        options = {"max_nodes": args.max_nodes, "time_limit": args.time_limit}
+    else:
+        options = {"max_moves": args.max_moves}
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        summary = simulate(args.games, args.strategy, args.start, args.workers, output, **options)
+    finally:
+        if args.output:
+            output.close()
+    print(json.dumps({"summary": summary}), file=sys.stderr if not args.output else sys.stdout)
@@ -1,17 +1,27 @@
 SLOT_WIDTH = 70
 SLOT_HEIGHT = 100
+CARD_OFFSET = 20
+
+# Tipos de slot (Slot.kind)
+STOCK_SLOT = "stock"
+WASTE_SLOT = "waste"
+FOUNDATION_SLOT = "foundation"
+TABLEAU_SLOT = "tableau"
 
 import flet as ft
 
 class Slot(ft.Container):
-    def __init__(self, solitaire, top, left, border):
+    def __init__(self, solitaire, pile_id, kind, top, left, border):
         super().__init__()
         self.pile=[]
+        self.pile_id=pile_id
+        self.kind=kind
+        self.offset=CARD_OFFSET if kind == TABLEAU_SLOT else 0
         self.width=SLOT_WIDTH
         self.height=SLOT_HEIGHT
         self.left=left
         self.top=top
-        self.on_click=self.click
+        self.on_click=solitaire.handler("slot.click", self.click)
         self.solitaire=solitaire
         self.border=border
         self.border_radius = ft.border_radius.all(6)
@@ -20,6 +30,10 @@ class Slot(ft.Container):
         if len(self.pile) > 0:
             return self.pile[-1]
 
+    def card_top(self, index):
+        """Posição vertical da carta na posição `index` da pilha"""
+        return self.top + index * self.offset
+
     def click(self, e):
-        if self == self.solitaire.stock:
+        if self.kind == STOCK_SLOT:
             self.solitaire.restart_stock()
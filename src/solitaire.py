@@ -1,55 +1,175 @@
 SOLITAIRE_WIDTH = 1000
-SOLITAIRE_HEIGHT = 500
+SOLITAIRE_HEIGHT = 700  # os botões e as colunas mais compridas do tableau cabem sem cortes
 CARD_OFFSET = 20
-
+CARD_BACKS = [
+    ("Padrão", "card_back.png"),
+    ("Pokemon", "pokemon_back.jpg"),
+    ("YuGiOh", "yugioh_back.jpg"),
+    ("Uno", "uno_back.png"),
+]
+AUTO_COMPLETE_ANIMATION = 300  # ms de cada carta a caminho da fundação no Autocompletar
+WIN_ANIMATION = 2000  # ms de cada carta a voar das fundações quando se ganha
+WIN_ANIMATION_WAVES = 4  # grupos de cartas da animação da vitória, cada um num só update
+WIN_ANIMATION_INTERVAL = 300  # ms entre grupos
+REPLAY_STEP = 0.5  # segundos entre ações ao reproduzir uma gravação a 1×
+REPLAY_FRAME = 1 / 30  # intervalo mínimo entre envios ao cliente durante a reprodução
+REPLAY_SPEEDS = (1, 10, 100)
+SAVE_KEY = "solitaire_state"  # "Salvar Jogo", no armazenamento do cliente
+AUTOSAVE_KEY = "solitaire_autosave"  # gravação automática, separada para não apagar a do jogador
+
+import asyncio
 import json
 import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
 
 import flet as ft
-from card import Card
-from slot import Slot
+from animation import Timeline
+from autosave import AUTOSAVER
+from card import DRAG_METER, Card, DragMeter
+from deals import DIFFICULTIES, deal_order, get_index, new_seed
+from hibernation import MONITOR
+from history import MoveLog
+from instrumentation import INSTRUMENTATION, INSTRUMENTATION_OVERLAY, STATS, instrumented, watch_page
+from layers import CardLayers
+from model import CODE_MASK, DECK_SIZE, FACE_UP, FOUNDATIONS, RANKS, STOCK, SUITES, TABLEAU, WASTE, GameState, Move, MoveGenerator, card_code
+from slot import FOUNDATION_SLOT, STOCK_SLOT, TABLEAU_SLOT, WASTE_SLOT, Slot
+from recording import ACTION, UNDO_EVENT, GameRecord, decode_move
+from solver import SOLVED, UNWINNABLE, SolverPool, describe
+from stats import STATS_PATH, get_stats
+from store import get_store
+
+# Um só pool por processo do servidor, partilhado por todas as sessões
+SOLVER_POOL = SolverPool()
 
 
 class Suite:
+    __slots__ = ("name", "color")
+
     def __init__(self, suite_name, suite_color):
         self.name = suite_name
         self.color = suite_color
 
 
 class Rank:
+    __slots__ = ("name", "value")
+
     def __init__(self, card_name, card_value):
         self.name = card_name
         self.value = card_value
 
+
+# Naipes e valores partilhados por todas as cartas de todas as sessões (não os alterar)
+SUITE_OBJECTS = tuple(Suite(name, color) for name, color in SUITES)
+RANK_OBJECTS = tuple(Rank(name, value) for name, value in RANKS)
+
+class SessionHandler:
+    """Handler de evento que corre com o hibernation_lock da sessão.
+
+    A hibernação nunca desmonta o tabuleiro a meio de um handler, e cada evento
+    conta como atividade, mesmo que o handler só envie as cartas com
+    page.update(). Depois da hibernação só resume responde: os outros controls
+    já foram libertados.
+    """
+
+    # Cada carta tem cinco handlers: sem __dict__ ocupam pouco em cada sessão
+    __slots__ = ("solitaire", "method")
+
+    def __init__(self, solitaire, method):
+        self.solitaire = solitaire
+        self.method = method
+
+    def __call__(self, *args, **kwargs):
+        solitaire = self.solitaire
+        with solitaire.hibernation_lock:
+            solitaire.last_activity = time.monotonic()
+            if solitaire.hibernated is not None and self.method != solitaire.resume:
+                return None
+            return self.method(*args, **kwargs)
+
+
 class Solitaire(ft.Stack):
     def __init__(self):
         super().__init__()
         self.score = 0
         self.width = SOLITAIRE_WIDTH
         self.height = SOLITAIRE_HEIGHT
-        self.history = []
+        self.history = MoveLog()
+        self.recording = None  # GameRecord do jogo atual (semente e jogadas)
+        self.game_started = time.monotonic()
+        self.game_ended = True  # já contado nas estatísticas (ou não conta, como uma reprodução)
+        self.state = GameState()
+        self.move_generator = MoveGenerator(self.state)  # jogadas permitidas, atualizadas a cada jogada
+        self.layers = CardLayers(self)
+        self.pending_moves = None  # lista de jogadas da transação aberta por batch()
+        self.last_activity = time.monotonic()
+        self.hibernated = None  # jogo guardado (GameState.encode) enquanto a sessão hiberna
+        self.hibernation_lock = threading.RLock()  # os handlers e a hibernação nunca correm ao mesmo tempo
+        self.state_version = 0  # muda a cada jogada, no fim de cada transação
+        self.autosave_state = None  # cópia do estado depois da última jogada, para a thread do autosave
+        self.cards_scattered = False  # cartas fora dos slots pela animação da vitória
+        self.player_token = None  # chave dos jogos no store do servidor (store.py)
         self.foundations = []
         self.is_dark_mode = False
         self.card_back_image = "/images/card_back.png"
         self.stock_cards = []
+        self.seed = None  # semente da distribuição atual
+        self.difficulty = None  # None = qualquer distribuição com solução
+        self.drag_meter = DragMeter()
+        self.show_drag_meter = DRAG_METER  # mostra as atualizações/s do arrasto por baixo do score (SOLITAIRE_DRAG_METER=1)
 
-        self.restart_button = ft.ElevatedButton(text="Reiniciar Jogo", on_click=self.restart_game, color="white")
-        self.undo_button = ft.ElevatedButton(text="Desfazer Jogada", on_click=self.undo_move, color="white")
-        self.save_button = ft.ElevatedButton(text="Salvar Jogo", on_click=self.save_game, color="white")
-        self.load_button = ft.ElevatedButton(text="Carregar Jogo", on_click=self.load_game, color="white")
-        self.mode_button = ft.ElevatedButton(text="Modo Claro", on_click=self.toggle_mode, color="white")
-
-        self.back_card_button = ft.PopupMenuButton(
-            items=[
-                ft.PopupMenuItem(text="Padrão", on_click=lambda e: self.set_card_back("card_back.png")),
-                ft.PopupMenuItem(text="Pokemon", on_click=lambda e: self.set_card_back("pokemon_back.jpg")),
-                ft.PopupMenuItem(text="YuGiOh", on_click=lambda e: self.set_card_back("yugioh_back.jpg")),
-                ft.PopupMenuItem(text="Uno", on_click=lambda e: self.set_card_back("uno_back.png")),
-            ],
-            icon_color="black" if not self.is_dark_mode else "white"
+        # Última ação medida pela instrumentação (SOLITAIRE_INSTRUMENTATION_OVERLAY=1)
+        self.action_text = ft.Text("", size=12, visible=INSTRUMENTATION_OVERLAY)
+
+        self.restart_button = ft.ElevatedButton(
+            text="Reiniciar Jogo", on_click=self.handler("restart_game", self.restart_game), color="white"
         )
+        self.undo_button = ft.ElevatedButton(
+            text="Desfazer Jogada", on_click=self.handler("undo_move", self.undo_move), color="white"
+        )
+        self.redo_button = ft.ElevatedButton(
+            text="Refazer Jogada", on_click=self.handler("redo_move", self.redo_move), color="white"
+        )
+        self.hint_button = ft.ElevatedButton(text="Dica", on_click=self.handler("show_hint", self.show_hint), color="white")
+        self.auto_complete_button = ft.ElevatedButton(
+            text="Autocompletar", on_click=self.handler("auto_complete", self.auto_complete), color="white", disabled=True
+        )
+        self.save_button = ft.ElevatedButton(
+            text="Salvar Jogo", on_click=self.handler("save_game", self.save_game), color="white"
+        )
+        self.load_button = ft.ElevatedButton(
+            text="Carregar Jogo", on_click=self.handler("load_game", self.load_game), color="white"
+        )
+        self.continue_button = ft.ElevatedButton(
+            text="Continuar", on_click=self.handler("continue_game", self.continue_game), color="white"
+        )
+        self.mode_button = ft.ElevatedButton(
+            text="Modo Claro", on_click=self.handler("toggle_mode", self.toggle_mode), color="white"
+        )
+
+        # Os itens dos menus só são criados depois do primeiro tabuleiro (create_menu_items)
+        self.back_card_button = self.create_back_card_button("black" if not self.is_dark_mode else "white", items=False)
+
+        # Imagens invisíveis que obrigam o cliente a descarregar as traseiras antes de serem usadas
+        self.preloaded_backs = set()
+        self.preload_box = ft.Stack(controls=[], width=1, height=1)
+
+        self.stats_button = ft.ElevatedButton(
+            text="Estatísticas",
+            on_click=self.handler("show_stats", self.show_stats),
+            color="white",
+            visible=bool(STATS_PATH),
+        )
+        self.recording_button = ft.PopupMenuButton(content=ft.Text("Gravação"))
+        self.difficulty_button = ft.PopupMenuButton(content=ft.Text("Dificuldade"))
 
         self.score_text = ft.Text(f"Score: {self.score}", size=20)
+        self.hint_text = ft.Text("", size=14)
+        self.hinted_cards = []
+        self.hint_future = None
+        self.drag_rate_text = ft.Text("", size=12, visible=self.show_drag_meter)
 
         self.controls = self.initiate_controls()
 
@@ -64,6 +184,8 @@ class Solitaire(ft.Stack):
         spacing = 10
 
         controls = [
+            ft.Container(content=self.preload_box, width=1, height=1, opacity=0, left=0, top=0),
+
             ft.Container(
                 content=self.restart_button,
                 top=10,
@@ -73,7 +195,7 @@ class Solitaire(ft.Stack):
             ),
 
             ft.Container(
-                content=self.undo_button,
+                content=self.difficulty_button,
                 top=10 + button_height + spacing,
                 right=30,
                 width=button_width,
@@ -81,7 +203,7 @@ class Solitaire(ft.Stack):
             ),
 
             ft.Container(
-                content=self.save_button,
+                content=self.undo_button,
                 top=10 + 2 * (button_height + spacing),
                 right=30,
                 width=button_width,
@@ -89,7 +211,7 @@ class Solitaire(ft.Stack):
             ),
 
             ft.Container(
-                content=self.load_button,
+                content=self.redo_button,
                 top=10 + 3 * (button_height + spacing),
                 right=30,
                 width=button_width,
@@ -97,7 +219,7 @@ class Solitaire(ft.Stack):
             ),
 
             ft.Container(
-                content=self.mode_button,
+                content=self.hint_button,
                 top=10 + 4 * (button_height + spacing),
                 right=30,
                 width=button_width,
@@ -105,7 +227,7 @@ class Solitaire(ft.Stack):
             ),
 
             ft.Container(
-                content=self.back_card_button,
+                content=self.auto_complete_button,
                 top=10 + 5 * (button_height + spacing),
                 right=30,
                 width=button_width,
@@ -113,8 +235,82 @@ class Solitaire(ft.Stack):
             ),
 
             ft.Container(
-                content=self.score_text,
+                content=self.save_button,
                 top=10 + 6 * (button_height + spacing),
+                right=30,
+                width=button_width,
+                height=button_height
+            ),
+
+            ft.Container(
+                content=self.load_button,
+                top=10 + 7 * (button_height + spacing),
+                right=30,
+                width=button_width,
+                height=button_height
+            ),
+
+            ft.Container(
+                content=self.continue_button,
+                top=10 + 8 * (button_height + spacing),
+                right=30,
+                width=button_width,
+                height=button_height
+            ),
+
+            ft.Container(
+                content=self.recording_button,
+                top=10 + 9 * (button_height + spacing),
+                right=30,
+                width=button_width,
+                height=button_height
+            ),
+
+            ft.Container(
+                content=self.stats_button,
+                top=10 + 10 * (button_height + spacing),
+                right=30,
+                width=button_width,
+                height=button_height
+            ),
+
+            ft.Container(
+                content=self.mode_button,
+                top=10 + 11 * (button_height + spacing),
+                right=30,
+                width=button_width,
+                height=button_height
+            ),
+
+            ft.Container(
+                content=self.back_card_button,
+                top=10 + 12 * (button_height + spacing),
+                right=30,
+                width=button_width,
+                height=button_height
+            ),
+
+            ft.Container(
+                content=self.score_text,
+                top=10 + 13 * (button_height + spacing),
+                right=40
+            ),
+
+            ft.Container(
+                content=self.hint_text,
+                top=10 + 14 * (button_height + spacing),
+                right=40
+            ),
+
+            ft.Container(
+                content=self.drag_rate_text,
+                top=10 + 15 * (button_height + spacing),
+                right=40
+            ),
+
+            ft.Container(
+                content=self.action_text,
+                top=10 + 16 * (button_height + spacing),
                 right=40
             ),
         ]
@@ -143,87 +339,156 @@ class Solitaire(ft.Stack):
         self.score_text.color = text_color
         self.score_text.update()
 
-        self.back_card_button = ft.PopupMenuButton(
-            items=[
-                ft.PopupMenuItem(text="Padrão", on_click=lambda e: self.set_card_back("card_back.png")),
-                ft.PopupMenuItem(text="Pokemon", on_click=lambda e: self.set_card_back("pokemon_back.jpg")),
-                ft.PopupMenuItem(text="YuGiOh", on_click=lambda e: self.set_card_back("yugioh_back.jpg")),
-                ft.PopupMenuItem(text="Uno", on_click=lambda e: self.set_card_back("uno_back.png")),
-            ],
-            icon_color=text_color
-        )
+        self.back_card_button = self.create_back_card_button(text_color)
 
         self.update()
         self.page.update()
 
     def did_mount(self):
-        self.create_card_deck()
-        self.create_slots()
-        self.deal_cards()
+        watch_page(self.page)
+        MONITOR.register(self)
+        with self.batch():
+            self.create_card_deck()
+            self.create_slots()
+            self.deal_cards()
+        # O tabuleiro já está no cliente; os menus vêm a seguir
+        self.create_menu_items()
+        self.update()
+
+    def create_menu_items(self):
+        self.back_card_button.items = self.card_back_items()
+        self.recording_button.items = [
+            ft.PopupMenuItem(text="Exportar", on_click=self.handler("export_recording", self.export_recording)),
+            ft.PopupMenuItem(text="Importar", on_click=self.handler("import_recording", self.import_recording)),
+        ]
+        self.difficulty_button.items = [
+            ft.PopupMenuItem(text="Aleatório", on_click=self.handler("set_difficulty", lambda e: self.set_difficulty(None)))
+        ] + [
+            ft.PopupMenuItem(
+                text=label, on_click=self.handler("set_difficulty", lambda e, name=name: self.set_difficulty(name))
+            )
+            for name, label, _ in DIFFICULTIES
+        ]
+
+    def will_unmount(self):
+        MONITOR.unregister(self)
 
     def update(self):
+        if self.pending_moves is not None:
+            return  # dentro de batch() o envio fica para o commit, que faz sempre um update()
+        self.last_activity = time.monotonic()  # todas as ações do jogador acabam num update()
         super().update()
 
-    def restart_game(self, e):
-        self.clear_game_board()
-        self.controls = self.initiate_controls()
-        self.create_card_deck()
-        self.create_slots()
-        self.deal_cards()
+    @contextmanager
+    def batch(self):
+        """Transação de jogadas.
+
+        Dentro do bloco as jogadas são aplicadas ao modelo e à interface, mas o
+        histórico, a verificação de vitória e o update() só acontecem no fim,
+        uma vez. Se o bloco falhar as jogadas são revertidas. Blocos aninhados
+        juntam-se ao exterior.
+        """
+        if self.pending_moves is not None:
+            yield self.pending_moves
+            return
 
-        self.score = 0  # Reinicia corretamente o score
-        self.score_text.value = f"Score: {self.score}"  # Atualiza o texto diretamente
-        self.update()  # Atualiza a interface
+        moves = self.pending_moves = []
+        try:
+            yield moves
+        except BaseException:
+            for move in reversed(moves):
+                self.state.revert(move)
+            if moves:
+                self.render_moves(moves, reverted=True)
+            raise
+        finally:
+            self.pending_moves = None
+
+        self.history.record(moves)
+        if moves:
+            self.recording.add_action(moves)
+        self.state_changed(moves)
+        self.update_score()
+        if moves:
+            self.clear_hint()
+        if moves and self.check_win():
+            self.end_game(True)
+            self.winning_sequence()
+        self.update()
+
+    def apply_moves(self, moves):
+        """Aplica jogadas do modelo numa só transação e redesenha as pilhas tocadas"""
+        with self.batch():
+            for move in moves:
+                self.state.apply(move)
+                self.record(move)
+            self.render_moves(moves)
+
+    def restart_game(self, e):
+        # As cartas, os slots e os botões são os mesmos do jogo anterior: só se distribui de novo
+        with self.batch():
+            self.clear_hint()
+            self.deal_cards()
 
     def update_score(self):
-        self.score += 1
+        """Copia o score do modelo para o texto (sem atualizar a interface)"""
+        self.score = self.state.score
         self.score_text.value = f"Score: {self.score}"
-        self.update()
+
+    def handler(self, name, method):
+        """Embrulha um handler de evento da sessão (botões, cartas e slots); ver SessionHandler"""
+        return instrumented(name, SessionHandler(self, method), self.show_action)
+
+    def show_action(self, name, ms, updates, controls):
+        """Mostra a última ação medida; vai para o cliente no update seguinte"""
+        if self.action_text.visible:
+            self.action_text.value = f"{name}: {ms:.1f} ms, {updates} upd, {controls} controls"
+
+    def show_drag_rate(self):
+        """Atualiza o contador do arrasto; é enviado junto com a atualização do drop"""
+        if self.show_drag_meter:
+            self.drag_rate_text.value = f"Arrasto: {self.drag_meter.rate:.0f} upd/s"
 
     def check_foundations_rules(self, card, slot):
-        top_card = slot.get_top_card()
-        if card.slot in self.foundations:
-            # A carta já estava em uma fundação, então não adicionamos ponto
-            return False
-
-        if top_card is not None:
-            if card.suite.name == top_card.suite.name and card.rank.value - top_card.rank.value == 1:
-                self.update_score()
-                return True
-        else:
-            if card.rank.name == "Ace":
-                self.update_score()
-                return True
-        return False
+        # O ponto é somado pelo modelo quando a jogada é aplicada em Card.place
+        return self.state.check_foundations_rules(card.code, card.slot.pile_id, slot.pile_id)
 
     def check_tableau_rules(self, card, slot):
-        top_card = slot.get_top_card()
-        if top_card is not None:
-            if card.suite.color != top_card.suite.color and top_card.rank.value - card.rank.value == 1 and top_card.face_up:
-                self.update_score()
-                return True
-        else:
-            if card.rank.name == "King":
-                self.update_score()
-                return True
-        return False
-
-    def update_foundations_with_score(self, state):
-        for i, foundation in enumerate(self.foundations):
-            for card in state["foundations"][i]:
-                foundation.pile.append(card)
-                card.slot = foundation
-                card.top = foundation.top
-                card.left = foundation.left
-                self.update_score()
+        return self.state.check_tableau_rules(card.code, slot.pile_id)
+
+    def create_back_card_button(self, icon_color, items=True):
+        return ft.PopupMenuButton(
+            items=self.card_back_items() if items else [],
+            icon_color=icon_color,
+            # Ao abrir o menu o cliente começa logo a descarregar as traseiras
+            on_open=lambda e: self.preload_card_backs([f"/images/{image_name}" for _, image_name in CARD_BACKS]),
+        )
 
-    def set_card_back(self, image_name):
-        self.card_back_image = f"/images/{image_name}"
+    def card_back_items(self):
+        return [
+            ft.PopupMenuItem(
+                text=label,
+                on_click=self.handler("set_card_back", lambda e, image_name=image_name: self.set_card_back(image_name)),
+            )
+            for label, image_name in CARD_BACKS
+        ]
+
+    def preload_card_backs(self, sources):
+        """Põe as imagens ainda não carregadas na caixa invisível, com um só update"""
+        missing = [src for src in sources if src not in self.preloaded_backs]
+        if not missing:
+            return
+        self.preloaded_backs.update(missing)
+        self.preload_box.controls.extend(ft.Image(src=src, width=1, height=1) for src in missing)
+        self.preload_box.update()
 
-        # Atualiza todas as cartas viradas para baixo
+    def set_card_back(self, image_name):
+        # A imagem já foi pedida ao cliente quando o menu abriu (preload_card_backs).
+        # Troca a imagem de todas as cartas viradas para baixo sem atualizar carta a carta;
+        # o page.update() do diálogo envia tudo de uma vez
         for card in self.all_cards:
             if not card.face_up:
-                card.turn_face_down()  # Remova o argumento se a função não precisar dele
+                card.content.content.src = self.card_back_image
 
         dlg = ft.AlertDialog(
             title=ft.Text("Traseira alterada!"),
@@ -240,320 +505,666 @@ class Solitaire(ft.Stack):
         self.page.update()
 
     def create_card_deck(self):
-        suites = [
-            Suite("hearts", "RED"),
-            Suite("diamonds", "RED"),
-            Suite("clubs", "BLACK"),
-            Suite("spades", "BLACK"),
-        ]
-        ranks = [
-            Rank("Ace", 1),
-            Rank("2", 2),
-            Rank("3", 3),
-            Rank("4", 4),
-            Rank("5", 5),
-            Rank("6", 6),
-            Rank("7", 7),
-            Rank("8", 8),
-            Rank("9", 9),
-            Rank("10", 10),
-            Rank("Jack", 11),
-            Rank("Queen", 12),
-            Rank("King", 13),
-        ]
-
-        # Cria uma lista com todas as 52 cartas
+        # Cria uma lista com todas as 52 cartas, ordenada pelo código da carta
+        # (all_cards[code] é a carta com esse código no modelo)
         self.all_cards = []
-        for suite in suites:
-            for rank in ranks:
-                card = Card(solitaire=self, suite=suite, rank=rank)
+        for suite_index, suite in enumerate(SUITE_OBJECTS):
+            for rank in RANK_OBJECTS:
+                card = Card(solitaire=self, suite=suite, rank=rank, code=card_code(suite_index, rank.value))
                 self.all_cards.append(card)
         self.cards = self.all_cards.copy()
+        self.cards_by_name = {(card.suite.name, card.rank.name): card for card in self.all_cards}
 
     def create_slots(self):
-        self.stock = Slot(solitaire=self, top=0, left=0, border=ft.border.all(1))
+        self.stock = Slot(solitaire=self, pile_id=STOCK, kind=STOCK_SLOT, top=0, left=0, border=ft.border.all(1))
 
-        self.waste = Slot(solitaire=self, top=0, left=100, border=None)
+        self.waste = Slot(solitaire=self, pile_id=WASTE, kind=WASTE_SLOT, top=0, left=100, border=None)
 
         self.foundations = []
         x = 300
         for i in range(4):
             self.foundations.append(
-                Slot(solitaire=self, top=0, left=x, border=ft.border.all(1, "outline"))
+                Slot(
+                    solitaire=self,
+                    pile_id=FOUNDATIONS[i],
+                    kind=FOUNDATION_SLOT,
+                    top=0,
+                    left=x,
+                    border=ft.border.all(1, "outline"),
+                )
             )
             x += 100
 
         self.tableau = []
         x = 0
         for i in range(7):
-            self.tableau.append(Slot(solitaire=self, top=150, left=x, border=None))
+            self.tableau.append(
+                Slot(solitaire=self, pile_id=TABLEAU[i], kind=TABLEAU_SLOT, top=150, left=x, border=None)
+            )
             x += 100
 
+        # slots[pile_id] é o Slot que desenha a pilha do modelo
+        self.slots = [self.stock, self.waste] + self.foundations + self.tableau
+
         self.controls.append(self.stock)
         self.controls.append(self.waste)
         self.controls.extend(self.foundations)
         self.controls.extend(self.tableau)
         self.update()
 
-    def deal_cards(self):
-        random.shuffle(self.cards)
-        self.controls.extend(self.cards)
-
-        # deal to tableau
-        first_slot = 0
-        remaining_cards = self.cards
-
-        while first_slot < len(self.tableau):
-            for slot in self.tableau[first_slot:]:
-                top_card = remaining_cards[0]
-                top_card.place(slot)
-                remaining_cards.remove(top_card)
-            first_slot += 1
-
-        # Limpa o estoque antes de adicionar as cartas restantes
-        self.stock.pile.clear()
-
-        for card in remaining_cards:
-            card.place(self.stock)
-            card.turn_face_down() # garante que as cartas estejam viradas para baixo.
-            print(f"Card in stock: {card.rank.name} {card.suite.name}")
-
+    def deal_cards(self, seed=None):
+        self.end_game(False)
+        if seed is None:
+            seed = self.draw_seed()
+        self.seed = seed
+        self.cards = [self.all_cards[code] for code in deal_order(seed)]
+        for card in self.cards:
+            card.animate_position = None  # as cartas podem vir da animação de vitória do jogo anterior
+        self.cards_scattered = False
+        self.layers.reset(self.cards)
+
+        self.state.deal([card.code for card in self.cards])
+        self.state_changed()
+        self.render_state()
         self.update()
 
-        for slot in self.tableau:
-            slot.get_top_card().turn_face_up()
-
-        self.update()
-
-        self.save_state()
+        self.history.reset()
+        self.recording = GameRecord.from_seed(seed)
+        self.game_started = time.monotonic()
+        self.game_ended = False
+
+    def draw_seed(self):
+        """Semente com solução do índice (deals.json) ou, sem índice, uma semente qualquer"""
+        seed = get_index().draw(self.difficulty)
+        return new_seed() if seed is None else seed
+
+    def set_difficulty(self, difficulty):
+        self.difficulty = difficulty
+        self.restart_game(None)
+
+    def render_state(self):
+        """Coloca cada carta no slot, posição e face indicados por self.state"""
+        for slot in self.slots:
+            self.render_pile(slot)
+        self.update_score()
+
+    def render_pile(self, slot):
+        pile = self.state.piles[slot.pile_id]
+        slot.pile = [self.all_cards[code & CODE_MASK] for code in pile]
+        for index, (card, code) in enumerate(zip(slot.pile, pile)):
+            card.slot = slot
+            card.index = index
+            card.left = slot.left
+            card.top = slot.card_top(index)
+            if card.face_up != bool(code & FACE_UP):
+                card.set_face(bool(code & FACE_UP))
+
+    def render_moves(self, moves, reverted=False):
+        """Volta a desenhar só as pilhas tocadas pelas jogadas"""
+        self.gather_cards()
+        for pile_id in {move.src for move in moves} | {move.dst for move in moves}:
+            self.render_pile(self.slots[pile_id])
+        # As cartas que mudaram de pilha ficam por cima das outras
+        moved_cards = []
+        for move in reversed(moves) if reverted else moves:
+            if move.count:
+                moved_cards.extend(self.slots[move.src if reverted else move.dst].pile[-move.count:])
+        self.layers.raise_to_top(moved_cards)
+        self.update_score()
 
     def restart_stock(self):
         """Reinicia as cartas do estoque"""
-        if not self.stock.pile:  # Verifica se o estoque está vazio
-            cards_to_move = self.waste.pile.copy() # Make a copy to prevent modification during iteration
-            for card in cards_to_move:
-                if card in self.waste.pile: #Verify if the card is still inside the waste pile.
-                    self.waste.pile.remove(card)
-                    card.place(self.stock)
-                    card.turn_face_down()  # Vira a carta para baixo
-                    print(f"Card moved from waste to stock: {card.rank.name} {card.suite.name}")
-                else:
-                    print(f"Card {card.rank.name} {card.suite.name} not found in waste pile, skipping.")
+        if not self.stock.pile and self.waste.pile:  # Verifica se o estoque está vazio
+            self.apply_moves([Move(WASTE, STOCK, len(self.waste.pile))])
 
+    def check_win(self):
+        # O modelo conta as cartas nas fundações: ganha-se com as 52 (O(1))
+        return self.state.is_won()
+
+    @property
+    def auto_finish_available(self):
+        """Stock e descarte vazios e todas as cartas do tableau viradas para cima"""
+        return self.state.can_auto_finish()
+
+    def state_changed(self, moves=None, autosave=True):
+        """Chamado depois de o modelo mudar; sem `moves` o estado foi substituído"""
+        self.state_version += 1
+        if moves is None:
+            self.move_generator.reset(self.state)
         else:
-            for card in self.stock.pile:
-                card.turn_face_down()
-
-        self.update()  # Atualiza a página apenas uma vez
+            self.move_generator.update(moves)
+            if moves and autosave:
+                # A thread do autosave só lê esta cópia, nunca o estado que os handlers alteram
+                self.autosave_state = self.state.copy()
+                AUTOSAVER.mark(self)
+        self.auto_complete_button.disabled = not self.auto_finish_available
+
+    def forced_foundation_moves(self):
+        """Jogadas que levam todas as cartas possíveis para as fundações, uma a uma"""
+        state = self.state.copy()
+        # Parte das jogadas já calculadas a cada jogada, em vez de as gerar de novo
+        generator = self.move_generator.copy(state)
+        moves = []
+        while True:
+            candidates = [move for move in generator.foundation_moves() if move.src not in FOUNDATIONS]
+            if not candidates:
+                return moves
+            move = candidates[0]
+            state.apply(move)
+            generator.update([move])
+            moves.append(move)
+
+    def auto_complete(self, e):
+        """Leva as cartas para as fundações numa só animação e numa só entrada do histórico"""
+        moves = self.forced_foundation_moves()
+        if not moves:
+            return
+        with self.batch():
+            self.apply_moves(moves)
+            moved_cards = []
+            for slot in self.foundations:
+                count = sum(1 for move in moves if move.dst == slot.pile_id)
+                moved_cards.extend(slot.pile[len(slot.pile) - count:])
+            for card in moved_cards:
+                card.animate_position = AUTO_COMPLETE_ANIMATION
+        for card in moved_cards:
+            card.animate_position = None
+
+    def end_game(self, won):
+        """Conta o jogo atual nas estatísticas: ganho, ou abandonado depois de pelo menos uma jogada"""
+        if self.game_ended or (not won and not self.recording):
+            return
+        self.game_ended = True
+        stats = get_stats()
+        if stats is not None and self.page is not None:
+            stats.record_game(self.player_key(), won, self.state.score, time.monotonic() - self.game_started)
+
+    def show_stats(self, e):
+        stats = get_stats()
+        if stats is None:
+            return
+        player = stats.player(self.player_key())
+        lines = []
+        if player is None:
+            lines.append(ft.Text("Ainda não terminou nenhum jogo."))
+        else:
+            fastest = f"{player['fastest_win']:.0f} s" if player["fastest_win"] is not None else "-"
+            lines += [
+                ft.Text(player["name"], weight=ft.FontWeight.BOLD),
+                ft.Text(f"Jogos: {player['games']}   Vitórias: {player['wins']}"),
+                ft.Text(f"Melhor score: {player['best_score']}   Vitória mais rápida: {fastest}"),
+                ft.Text(f"Sequência de vitórias: {player['streak']} (melhor {player['best_streak']})"),
+            ]
+        lines.append(ft.Text("Classificação", weight=ft.FontWeight.BOLD))
+        for position, entry in enumerate(stats.leaderboard(), 1):
+            lines.append(
+                ft.Text(f"{position}. {entry['name']}: {entry['wins']} vitórias (mais rápida {entry['fastest_win']:.0f} s)")
+            )
 
-    def check_win(self):
-        # Verifica se os quatro Ases estão nas fundações
-        aces_in_foundations = 0
-        for foundation in self.foundations:
-            for card in foundation.pile:
-                if card.rank.name == "Ace":
-                    aces_in_foundations += 1
-
-        if aces_in_foundations == 4:  # Se todos os 4 Ases estiverem nas fundações
-            self.play_win_sound()
-            return True
-        return False
+        dlg = ft.AlertDialog(
+            title=ft.Text("Estatísticas"),
+            content=ft.Column(lines, tight=True),
+            actions=[ft.TextButton("OK", on_click=lambda e: self.close_dialog())],
+        )
+        dlg.open = True
+        self.page.dialog = dlg
+        self.page.update()
 
     def winning_sequence(self):
-        print("Função winning_sequence() chamada!")
-
-        for slot in self.foundations:
-            for card in slot.pile:
-                card.animate_position = 2000
-                card.move_on_top()
-                card.top = random.randint(0, SOLITAIRE_HEIGHT)
-                card.left = random.randint(0, SOLITAIRE_WIDTH)
+        """Faz voar as cartas das fundações em WIN_ANIMATION_WAVES updates, numa tarefa assíncrona"""
+        if self.page is None:
+            return
+
+        cards = [card for slot in self.foundations for card in slot.pile]
+        wave_size = -(-len(cards) // WIN_ANIMATION_WAVES)
+        timeline = Timeline()
+        for index, card in enumerate(cards):
+            timeline.at(
+                index // wave_size * WIN_ANIMATION_INTERVAL,
+                card,
+                animate_position=WIN_ANIMATION,
+                top=random.randint(0, SOLITAIRE_HEIGHT),
+                left=random.randint(0, SOLITAIRE_WIDTH),
+            )
+        self.page.run_task(self.play_winning_animation, timeline, self.state_version)
+
+    async def play_winning_animation(self, timeline, version):
+        async def flush(cards):
+            await asyncio.to_thread(self.flush_winning_frame, cards)
+
+        self.cards_scattered = True
+        # Um jogo novo, desfazer ou a hibernação durante a animação param-na
+        finished = await timeline.play(flush, lambda: self.state_version != version or self.hibernated is not None)
+        await asyncio.to_thread(self.finish_winning_animation, finished)
+
+    # Correm numa thread, com o lock dos handlers, para não bloquear o event loop
+    def flush_winning_frame(self, cards):
+        with self.hibernation_lock:
+            if self.hibernated is None:
+                self.layers.raise_to_top(cards)
                 self.update()
 
+    def finish_winning_animation(self, finished):
+        with self.hibernation_lock:
+            if finished:
+                self.show_win_dialog()
+            elif self.hibernated is None and self.cards_scattered:
+                self.gather_cards()
+                self.update()
+
+    def gather_cards(self):
+        """Volta a pôr nos slots as cartas espalhadas pela animação da vitória (sem update)"""
+        if not self.cards_scattered:
+            return
+        self.cards_scattered = False
+        for card in self.all_cards:
+            card.animate_position = None
+        self.sync_board()
+
+    def show_win_dialog(self):
         dlg = ft.AlertDialog(
             title=ft.Text("Yupi! Ganhou o jogo!"),
             actions=[
-                ft.TextButton("OK", on_click=self.close_dialog),
-                ft.TextButton("Recomeçar", on_click=self.restart_game),
+                ft.TextButton("OK", on_click=lambda e: self.close_dialog()),
+                ft.TextButton("Recomeçar", on_click=self.handler("restart_game", self.restart_game)),
             ],
             open=True
         )
-
         self.page.dialog = dlg
-        self.update()
+        self.page.update()
 
-    def save_state(self):
-        state = {
-            "stock": list(self.stock.pile),
-            "waste": list(self.waste.pile),
-            "foundations": [list(slot.pile) for slot in self.foundations],
-            "tableau": [list(slot.pile) for slot in self.tableau],
-        }
-        self.history.append(state)
-
-    def restore_state(self, state):
-        self.stock.pile.clear()
-        self.waste.pile.clear()
-        for slot in self.foundations:
-            slot.pile.clear()
-        for slot in self.tableau:
-            slot.pile.clear()
-
-        for card in state["stock"]:
-            self.stock.pile.append(card)
-            card.slot = self.stock
-            card.top = self.stock.top
-            card.left = self.stock.left
-
-        for card in state["waste"]:
-            self.waste.pile.append(card)
-            card.slot = self.waste
-            card.top = self.waste.top
-            card.left = self.waste.left
-
-        for i, foundation in enumerate(self.foundations):
-            for card in state["foundations"][i]:
-                foundation.pile.append(card)
-                card.slot = foundation
-                card.top = foundation.top
-                card.left = foundation.left
-
-        for i, tableau_slot in enumerate(self.tableau):
-            for j, card in enumerate(state["tableau"][i]):
-                tableau_slot.pile.append(card)
-                card.slot = tableau_slot
-                card.top = tableau_slot.top + j * CARD_OFFSET
-                card.left = tableau_slot.left
-
-            if tableau_slot.pile and not tableau_slot.pile[-1].face_up:
-                tableau_slot.pile[-1].turn_face_up()
+    def record(self, *moves):
+        """Junta jogadas de uma ação do jogador à transação; fora de batch() abre uma só para elas"""
+        with self.batch() as pending:
+            pending.extend(move for move in moves if move is not None)
+
+    def restore_state(self, state, update=True):
+        """Passa o tabuleiro para `state` mexendo só nas cartas que mudaram de lugar ou de face.
+
+        As cartas do topo do tableau ficam viradas para cima; devolve essas viragens.
+        """
+        self.state = state.copy()
+        flips = [move for move in map(self.state.flip, TABLEAU) if move is not None]
+        self.state_changed()
+        self.gather_cards()
+        self.sync_board()
+        self.update_score()
+        if update:
+            self.update()
+        return flips
+
+    def sync_board(self):
+        """Põe cada carta no lugar e face de self.state, mexendo só nas que estão diferentes"""
+        # Em cada pilha, a primeira carta que mudou e as de cima sobem, pela ordem da pilha
+        moved_cards = []
+        for slot in self.slots:
+            first_moved = self.sync_pile(slot)
+            if first_moved is not None:
+                moved_cards.extend(slot.pile[first_moved:])
+        self.layers.raise_to_top(moved_cards)
+
+    def sync_pile(self, slot):
+        """Como render_pile, mas só altera as cartas diferentes; devolve o índice da primeira que mudou de lugar"""
+        pile = self.state.piles[slot.pile_id]
+        slot.pile = [self.all_cards[code & CODE_MASK] for code in pile]
+        first_moved = None
+        for index, (card, code) in enumerate(zip(slot.pile, pile)):
+            top = slot.card_top(index)
+            if card.slot is not slot or card.index != index or card.left != slot.left or card.top != top:
+                card.slot = slot
+                card.index = index
+                card.left = slot.left
+                card.top = top
+                if first_moved is None:
+                    first_moved = index
+            if card.face_up != bool(code & FACE_UP):
+                card.set_face(bool(code & FACE_UP))
+        return first_moved
 
+    def undo_move(self, e):
+        moves = self.history.undo(self.state)
+        if moves:
+            self.recording.add_undo()
+            self.state_changed(moves)
+            self.render_moves(moves, reverted=True)
+            self.clear_hint()
+            self.update()
+
+    def redo_move(self, e):
+        moves = self.history.redo(self.state)
+        if moves:
+            self.recording.add_redo()
+            self.state_changed(moves)
+            self.render_moves(moves)
+            self.clear_hint()
+            if self.check_win():
+                self.end_game(True)
+                self.winning_sequence()
+            self.update()
+
+    def show_hint(self, e):
+        """Pede ao solver a próxima jogada sem bloquear os eventos da sessão"""
+        if self.hint_future is not None and not self.hint_future.done():
+            return
+        key = self.state.key()
+        self.hint_text.value = "A pensar..."
         self.update()
+        self.hint_future = SOLVER_POOL.submit(
+            self.state, lambda result: self.hint_ready(result, key), lambda error: self.hint_failed(error, key)
+        )
 
-        for card in self.stock.pile:
-            card.face_up = False
-            card.turn_face_down()
-
+    def hint_ready(self, result, key):
+        # Chamado pela thread do pool; ignora respostas de posições antigas
+        if INSTRUMENTATION:
+            STATS.add("solver", result.elapsed * 1000, 0, 0)
+            print(f"[instrumentação] solver: {result!r}")  # inclui nós/s e a taxa de acertos da cache
+        with self.hibernation_lock:
+            if self.hibernated is None and self.state.key() == key and self.page is not None:
+                self.show_hint_result(result)
+
+    def show_hint_result(self, result):
+        if result.status == SOLVED:
+            move = result.hint()
+            pile = self.slots[move.src].pile
+            self.hinted_cards = pile[-move.count:] if move.count else pile[-1:]
+            for card in self.hinted_cards:
+                card.content.border = ft.border.all(3, "yellow")
+            self.hint_text.value = describe(move)
+        elif result.status == UNWINNABLE:
+            self.hint_text.value = "Nenhuma solução encontrada"  # com os cortes do solver, não é uma prova
+        else:
+            self.hint_text.value = "Sem dica (tempo esgotado)"
         self.update()
-        self.update_foundations_with_score(state)
 
-    def undo_move(self, e):
-        if len(self.history) < 2:
+    def hint_failed(self, error, key):
+        print(f"Erro no solver: {error!r}")
+        with self.hibernation_lock:
+            if self.hibernated is None and self.state.key() == key and self.page is not None:
+                self.hint_text.value = ""
+                self.update()
+
+    def clear_hint(self):
+        for card in self.hinted_cards:
+            card.content.border = None
+        self.hinted_cards = []
+        self.hint_text.value = ""
+
+    def hibernate(self, idle_timeout=None):
+        """Guarda o jogo numa string compacta e liberta as cartas, os slots e o histórico.
+
+        Com `idle_timeout` não hiberna se entretanto houve atividade (um handler que esperava pelo lock).
+        """
+        with self.hibernation_lock:
+            if self.hibernated is not None or self.pending_moves is not None:
+                return
+            if idle_timeout is not None and time.monotonic() - self.last_activity < idle_timeout:
+                return
+            self.hibernated = self.state.encode()
+            if self.hint_future is not None:
+                self.hint_future.cancel()
+                self.hint_future = None
+            self.hinted_cards = []
+            self.cards_scattered = False
+            self.layers.clear()
+            self.all_cards = self.cards = []
+            self.cards_by_name = {}
+            self.stock = self.waste = None
+            self.foundations, self.tableau, self.slots = [], [], []
+            self.history.reset()
+            self.state = GameState()
+            self.move_generator.reset(self.state)
+            self.controls = [
+                ft.Container(
+                    content=ft.Text("Jogo em pausa. Clique para continuar.", size=20),
+                    width=SOLITAIRE_WIDTH,
+                    height=SOLITAIRE_HEIGHT,
+                    alignment=ft.alignment.center,
+                    on_click=self.handler("resume", self.resume),
+                )
+            ]
+            self.update()
+
+    def resume(self, e=None):
+        """Volta a montar o tabuleiro de uma sessão hibernada, com um só update"""
+        with self.hibernation_lock:
+            if self.hibernated is None:
+                return
+            state = GameState.decode(self.hibernated)
+            with self.batch():
+                self.controls = self.initiate_controls()
+                self.create_card_deck()
+                self.create_slots()
+                self.layers.reset(self.all_cards)
+                flips = self.restore_state(state, update=False)
+                self.history.reset()
+                # O jogo continua: as viragens entram na gravação, senão a reprodução não as encontra
+                self.record(*flips)
+                self.hibernated = None
+
+    def player_key(self):
+        """Token do jogador: o parâmetro ?token= do endereço ou um token guardado no cliente"""
+        if self.player_token is None:
+            token = self.page.query.get("token") or self.page.client_storage.get("solitaire_token")
+            if not token:
+                token = secrets.token_urlsafe(16)
+                self.page.client_storage.set("solitaire_token", token)
+            self.player_token = token
+        return self.player_token
+
+    def write_save(self, saved, autosave=False):
+        store = get_store()
+        if store is not None:
+            store.put(self.save_key(autosave), saved)  # escrito no disco pela thread do store
+        else:
+            self.page.client_storage.set(AUTOSAVE_KEY if autosave else SAVE_KEY, saved)
+
+    def read_save(self, autosave=False):
+        store = get_store()
+        if store is not None:
+            return store.get(self.save_key(autosave))
+        return self.page.client_storage.get(AUTOSAVE_KEY if autosave else SAVE_KEY)
+
+    def save_key(self, autosave):
+        """Chave no store do servidor: o token do jogador, com um sufixo para o autosave"""
+        key = self.player_key()
+        return f"{key}:autosave" if autosave else key
+
+    def autosave(self):
+        """Chamado pela thread do autosave; grava a cópia tirada depois da última jogada"""
+        snapshot = self.autosave_state
+        if snapshot is not None:
+            self.write_save(snapshot.encode(), autosave=True)
+
+    def replay(self, record, speed=1):
+        """Reproduz uma gravação a `speed`× (1 a 100).
+
+        As ações são aplicadas numa tarefa assíncrona (play_replay), por isso o
+        handler devolve logo; com speed=None vai direto ao fim com um só update.
+        """
+        with self.batch():
+            self.clear_hint()
+            if record.seed is not None:
+                self.deal_cards(record.seed)
+            else:
+                self.end_game(False)
+                self.restore_state(record.initial_state(), update=False)
+                self.history.reset()
+                self.recording = GameRecord.from_state(self.state)
+            self.game_ended = True  # um jogo reproduzido não conta para as estatísticas
+
+        if speed:
+            self.page.run_task(self.play_replay, record.events(), REPLAY_STEP / min(max(speed, 1), 100))
             return
+        for kind, pairs in record.events():
+            self.replay_event(kind, pairs)
+        self.finish_replay()
+
+    async def play_replay(self, events, step):
+        """Aplica um evento a cada `step` segundos; quando são mais rápidos do que REPLAY_FRAME
+        vários vão no mesmo envio ao cliente. Uma jogada do jogador ou um jogo novo param-na."""
+        # Cada passo corre numa thread, como os handlers: espera pelo lock sem bloquear o event loop
+        last_flush = [time.monotonic()]
+        version = self.state_version
+        for kind, pairs in events:
+            version = await asyncio.to_thread(self.replay_step, kind, pairs, version, last_flush)
+            if version is None:
+                return
+            await asyncio.sleep(step)
+        await asyncio.to_thread(self.replay_step, None, None, version, last_flush)
+
+    def replay_step(self, kind, pairs, version, last_flush):
+        """Aplica um evento (ou termina a reprodução, com kind=None); devolve None se a reprodução parou"""
+        with self.hibernation_lock:
+            if self.state_version != version or self.hibernated is not None:
+                return None
+            if kind is None:
+                self.finish_replay()
+                return None
+            try:
+                self.replay_event(kind, pairs)
+            except ValueError as error:
+                # Jogada inválida a meio: o tabuleiro fica na última posição válida
+                print(f"Gravação: {error}")
+                self.update()
+                return None
+            if time.monotonic() - last_flush[0] >= REPLAY_FRAME:
+                self.update()
+                last_flush[0] = time.monotonic()
+            return self.state_version
+
+    def replay_event(self, kind, pairs):
+        if kind == ACTION:
+            moves = []
+            for src, dst in pairs:
+                moves.append(decode_move(self.state, src, dst))
+                self.state.apply(moves[-1])
+            self.history.record(moves)
+            self.recording.add_action(moves)
+            reverted = False
+        elif kind == UNDO_EVENT:
+            moves = self.history.undo(self.state)
+            if moves:
+                self.recording.add_undo()
+            reverted = True
+        else:
+            moves = self.history.redo(self.state)
+            if moves:
+                self.recording.add_redo()
+            reverted = False
+        if moves:
+            # Ver uma reprodução não substitui a gravação automática do jogo do jogador
+            self.state_changed(moves, autosave=False)
+            self.render_moves(moves, reverted)
+
+    def finish_replay(self):
+        self.update()
+        if self.check_win():
+            self.winning_sequence()
 
-        self.history.pop()
-        last_state = self.history[-1]
-        self.restore_state(last_state)
+    def export_recording(self, e):
+        text = self.recording.encode()
+        dlg = ft.AlertDialog(
+            title=ft.Text("Gravação do jogo"),
+            content=ft.TextField(value=text, read_only=True, multiline=True),
+            actions=[
+                ft.TextButton("Copiar", on_click=lambda e: self.page.set_clipboard(text)),
+                ft.TextButton("OK", on_click=lambda e: self.close_dialog()),
+            ],
+        )
+        dlg.open = True
+        self.page.dialog = dlg
+        self.page.update()
 
-    def serialize_state(self):
-        state = []
-        for card in self.all_cards:
-            slot_id = None
-            if card.slot is self.stock:
-                slot_id = "stock"
-            elif card.slot is self.waste:
-                slot_id = "waste"
-            else:
-                for i, foundation in enumerate(self.foundations):
-                    if card.slot is foundation:
-                        slot_id = f"foundation{i}"
-                        break
-                if slot_id is None:
-                    for i, tableau in enumerate(self.tableau):
-                        if card.slot is tableau:
-                            slot_id = f"tableau{i}"
-                            break
-            card_state = card.get_snapshot()
-            card_state["slot"] = slot_id
-            state.append(card_state)
-        return state
+    def import_recording(self, e):
+        field = ft.TextField(label="Gravação", multiline=True)
+        dlg = ft.AlertDialog(
+            title=ft.Text("Ver gravação"),
+            content=field,
+            actions=[
+                ft.TextButton(f"{speed}×", on_click=self.handler("play_recording", lambda e, speed=speed: self.play_recording(field.value, speed)))
+                for speed in REPLAY_SPEEDS
+            ],
+        )
+        dlg.open = True
+        self.page.dialog = dlg
+        self.page.update()
+
+    def play_recording(self, text, speed):
+        try:
+            record = GameRecord.decode(text or "")
+        except ValueError as error:
+            self.page.dialog.title = ft.Text(str(error))
+            self.page.update()
+            return
+        self.close_dialog()
+        try:
+            self.replay(record, speed)
+        except ValueError as error:
+            # Jogada inválida a meio: o tabuleiro fica na última posição válida
+            print(f"Gravação: {error}")
+            self.update()
 
     def save_game(self, e):
-        state = self.serialize_state()
-        self.page.client_storage.set("solitaire_state", json.dumps(state))
+        self.write_save(self.state.encode())
         self.page.snack_bar = ft.PopupMenuItem(ft.Text("Jogo salvo!"))
         self.page.snack_bar.open = True
         self.page.update()
 
     def load_game(self, e):
-        saved = self.page.client_storage.get("solitaire_state")
+        self.load_saved(self.read_save(), "Nenhum jogo salvo encontrado.")
+
+    def continue_game(self, e):
+        """Carrega a última gravação automática, mesmo que haja um jogo salvo pelo jogador"""
+        self.load_saved(self.read_save(autosave=True), "Nenhum jogo gravado automaticamente.")
+
+    def load_saved(self, saved, missing_message):
         if not saved:
-            dlg = ft.AlertDialog(title=ft.Text("Nenhum jogo salvo encontrado."))
+            dlg = ft.AlertDialog(title=ft.Text(missing_message))
             dlg.open = True
             self.page.dialog = dlg
             self.page.update()
             return
 
-        state = json.loads(saved)
-
-        self.stock.pile.clear()
-        self.waste.pile.clear()
-        for slot in self.foundations:
-            slot.pile.clear()
-        for slot in self.tableau:
-            slot.pile.clear()
-
-        slot_map = {"stock": self.stock, "waste": self.waste}
-        for i, foundation in enumerate(self.foundations):
-            slot_map[f"foundation{i}"] = foundation
-        for i, tableau in enumerate(self.tableau):
-            slot_map[f"tableau{i}"] = tableau
-
-        temp_slots = {slot_id: [] for slot_id in slot_map.keys()}
-
-        for card_state in state:
-            for card in self.all_cards:
-                if card.suite.name == card_state["suite"] and card.rank.name == card_state["rank"]:
-                    card.face_up = card_state["face_up"]
-                    card.left = card_state["left"]
-                    card.index = card_state["index"]
-                    slot_id = card_state["slot"]
-                    if slot_id in slot_map:
-                        card.slot = slot_map[slot_id]
-                        temp_slots[slot_id].append(card)
-
-                    if card.face_up:
-                        card.turn_face_up()
-                    else:
-                        card.turn_face_down()
-                    break
-
-        for slot_id, cards_list in temp_slots.items():
-            sorted_cards = sorted(cards_list, key=lambda card: card.index)
-            if slot_id.startswith("tableau"):
-                slot_obj = slot_map[slot_id]
-                for i, card in enumerate(sorted_cards):
-                    card.index = i
-                    card.top = slot_obj.top + i * CARD_OFFSET
-                    card.left = slot_obj.left
+        try:
+            if saved.lstrip().startswith("["):
+                state = self.state_from_legacy_save(json.loads(saved))
             else:
-                slot_obj = slot_map[slot_id]
-                for card in sorted_cards:
-                    card.top = slot_obj.top
-                    card.left = slot_obj.left
-            slot_map[slot_id].pile = sorted_cards
-
-        ordered_cards = []
-        ordered_cards.extend(self.stock.pile)
-        ordered_cards.extend(self.waste.pile)
-        for foundation in self.foundations:
-            ordered_cards.extend(foundation.pile)
-        for tableau in self.tableau:
-            ordered_cards.extend(tableau.pile)
-
-        non_card_controls = [c for c in self.controls if not isinstance(c, Card)]
-        self.controls = non_card_controls + ordered_cards
-        self.update()
+                state = GameState.decode(saved)
+        except (ValueError, KeyError, TypeError):
+            dlg = ft.AlertDialog(title=ft.Text("O jogo salvo não é válido."))
+            dlg.open = True
+            self.page.dialog = dlg
+            self.page.update()
+            return
+
+        # O tabuleiro e o diálogo vão no mesmo page.update()
+        self.end_game(False)
+        self.restore_state(state, update=False)
+        self.history.reset()
+        self.recording = GameRecord.from_state(self.state)
+        self.game_started = time.monotonic()
+        self.game_ended = False
+        self.clear_hint()
 
         dlg = ft.AlertDialog(title=ft.Text("Jogo carregado!"))
         dlg.open = True
         self.page.dialog = dlg
         self.page.update()
 
-    def clear_game_board(self):
-        # Remove todas as cartas da tela
-        for card in self.controls:
-            if isinstance(card, Card):
-                self.controls.remove(card)
-
-        self.update()
\ No newline at end of file
+    def state_from_legacy_save(self, entries):
+        """Lê o formato antigo (lista JSON de 52 cartas com slot, índice e face)"""
+        slot_ids = {"stock": STOCK, "waste": WASTE}
+        slot_ids.update({f"foundation{i}": slot.pile_id for i, slot in enumerate(self.foundations)})
+        slot_ids.update({f"tableau{i}": slot.pile_id for i, slot in enumerate(self.tableau)})
+
+        piles = {pile_id: [] for pile_id in range(len(self.slots))}
+        for entry in entries:
+            card = self.cards_by_name[(entry["suite"], entry["rank"])]
+            code = card.code | FACE_UP if entry["face_up"] else card.code
+            piles[slot_ids[entry["slot"]]].append((entry["index"] or 0, code))
+
+        state = GameState([bytearray(code for _, code in sorted(piles[pile_id])) for pile_id in sorted(piles)])
+        state.score = self.state.score
+        if sorted(code & CODE_MASK for pile in state.piles for code in pile) != list(range(DECK_SIZE)):
+            raise ValueError("Jogo guardado incompleto")
+        return state
\ No newline at end of file
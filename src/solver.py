@@ -0,0 +1,233 @@
+"""Solver de Klondike sobre o GameState de model.py.
+
+Procura em profundidade (com as jogadas mais promissoras primeiro), guarda as
+posições já visitadas numa tabela de transposição e corta jogadas dominadas:
+as cartas que podem ir com segurança para as fundações vão logo, as cartas
+viradas para baixo são viradas logo e não se mudam Reis de uma coluna vazia
+para outra. Corre num processo (ou thread) à parte através de SolverPool, para
+não bloquear os eventos da interface.
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from model import FACE_UP, FOUNDATIONS, STOCK, TABLEAU, WASTE, is_red, rank_of
+
+SOLVER_TIME_LIMIT = 2.0  # segundos por pedido
+SOLVER_MAX_NODES = 200_000  # posições novas visitadas por pedido
+SOLVER_WORKERS = 1
+
+SOLVED = "solved"
+UNWINNABLE = "unwinnable"  # a procura (com os cortes acima) esgotou-se sem solução
+UNKNOWN = "unknown"  # o orçamento acabou antes de uma resposta
+
+
+class SolveResult:
+    def __init__(self, status, moves, nodes, lookups, hits, elapsed):
+        self.status = status
+        self.moves = moves  # solução a partir da posição pedida (vazia se não houver)
+        self.nodes = nodes
+        self.lookups = lookups
+        self.hits = hits
+        self.elapsed = elapsed
+
+    @property
+    def nodes_per_sec(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def hint(self):
+        """Primeira jogada da solução, ou None"""
+        return self.moves[0] if self.moves else None
+
+    def __repr__(self):
+        return (
+            f"SolveResult({self.status}, {len(self.moves)} jogadas, {self.nodes} nós, "
+            f"{self.nodes_per_sec:.0f} nós/s, cache {self.hit_rate:.0%})"
+        )
+
+
+def canonical_key(state):
+    """Chave da tabela de transposição; a ordem das colunas do tableau não importa"""
+    piles = state.piles
+    tableau = sorted(bytes(piles[pile_id]) for pile_id in TABLEAU)
+    return b"/".join([bytes(piles[STOCK]), bytes(piles[WASTE])] + [bytes(piles[f]) for f in FOUNDATIONS] + tableau)
+
+
+class Solver:
+    def __init__(self, max_nodes=SOLVER_MAX_NODES, time_limit=SOLVER_TIME_LIMIT):
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+
+    def solve(self, state):
+        state = state.copy()
+        start = time.perf_counter()
+        deadline = start + self.time_limit
+        nodes = lookups = hits = steps = 0
+
+        path = [self.autoplay(state)]  # jogadas aplicadas em cada nível (a raiz nunca sai)
+        seen = {canonical_key(state)}
+        stack = [iter(self.children(state))]
+        status = UNWINNABLE
+
+        while stack:
+            if state.is_won():
+                status = SOLVED
+                break
+            steps += 1
+            if nodes >= self.max_nodes or (steps & 0xFF == 0 and time.perf_counter() > deadline):
+                status = UNKNOWN
+                break
+
+            for move in stack[-1]:
+                state.apply(move)
+                applied = [move] + self.autoplay(state)
+                key = canonical_key(state)
+                lookups += 1
+                if key in seen:
+                    hits += 1
+                    for undo in reversed(applied):
+                        state.revert(undo)
+                    continue
+                seen.add(key)
+                nodes += 1
+                path.append(applied)
+                stack.append(iter(self.children(state)))
+                break
+            else:
+                stack.pop()
+                if len(path) > 1:
+                    for undo in reversed(path.pop()):
+                        state.revert(undo)
+
+        moves = [move for applied in path for move in applied] if status == SOLVED else []
+        return SolveResult(status, moves, nodes, lookups, hits, time.perf_counter() - start)
+
+    def autoplay(self, state):
+        """Aplica as jogadas que nunca pioram a posição e devolve-as"""
+        applied = []
+        changed = True
+        while changed:
+            changed = False
+            for pile_id in TABLEAU:
+                flip = state.flip(pile_id)
+                if flip is not None:
+                    applied.append(flip)
+            for src in (WASTE,) + TABLEAU:
+                code = state.top(src)
+                if code is None or not code & FACE_UP:
+                    continue
+                dst = state.foundation_for(code, src)
+                if dst is not None and self.is_safe(state, code):
+                    applied.append(state.move(src, dst))
+                    changed = True
+        return applied
+
+    def is_safe(self, state, code):
+        """Uma carta pode ir já para a fundação se nenhuma carta da outra cor precisar dela"""
+        rank = rank_of(code)
+        if rank <= 2:
+            return True
+        heights = [
+            len(state.piles[pile_id])
+            for pile_id in FOUNDATIONS
+            if state.piles[pile_id] and is_red(state.piles[pile_id][0]) != is_red(code)
+        ]
+        return len(heights) == 2 and min(heights) >= rank - 1
+
+    def children(self, state):
+        """Jogadas a explorar, das mais promissoras para as menos"""
+        foundation, revealing, others, stock = [], [], [], []
+        for move in state.legal_moves():
+            if move.flip:
+                continue
+            if move.src == STOCK or move.dst == STOCK:
+                stock.append(move)
+            elif move.dst in FOUNDATIONS:
+                foundation.append(move)
+            elif move.src in FOUNDATIONS:
+                continue  # tirar cartas das fundações raramente ajuda; fica fora da procura
+            elif move.src in TABLEAU:
+                pile = state.piles[move.src]
+                below = len(pile) - move.count - 1
+                if below < 0:
+                    if not state.piles[move.dst]:
+                        continue  # Rei de uma coluna vazia para outra coluna vazia
+                    others.append(move)
+                elif not pile[below] & FACE_UP:
+                    revealing.append(move)
+                elif self.frees_foundation_card(state, pile[below], move.src):
+                    others.append(move)
+                # as outras partes de sequências só trocam cartas de sítio
+            else:
+                others.append(move)
+        return foundation + revealing + others + stock
+
+    def frees_foundation_card(self, state, code, src):
+        return state.foundation_for(code, src) is not None
+
+
+def solve(state, max_nodes=SOLVER_MAX_NODES, time_limit=SOLVER_TIME_LIMIT):
+    return Solver(max_nodes, time_limit).solve(state)
+
+
+class SolverPool:
+    """Corre o solver fora da thread dos eventos.
+
+    Com `processes=True` usa um processo à parte (o GIL não é partilhado com as
+    outras sessões do servidor); com False usa uma thread.
+    """
+
+    def __init__(self, workers=SOLVER_WORKERS, processes=True):
+        self.workers = workers
+        self.processes = processes
+        self.executor = None
+
+    def submit(self, state, callback, on_error=None, max_nodes=SOLVER_MAX_NODES, time_limit=SOLVER_TIME_LIMIT):
+        """Pede a solução de `state`; `callback(result)` é chamado quando terminar e
+        `on_error(exception)` se o solver falhar (um pedido cancelado não chama nenhum)"""
+        if self.executor is None:
+            if self.processes:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        future = self.executor.submit(solve, state.copy(), max_nodes, time_limit)
+        future.add_done_callback(lambda f: self.done(f, callback, on_error))
+        return future
+
+    def done(self, future, callback, on_error):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            callback(future.result())
+            return
+        if isinstance(error, BrokenExecutor):
+            self.executor = None  # o processo morreu: o próximo pedido cria outro
+        if on_error is not None:
+            on_error(error)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+def describe(move):
+    """Texto curto de uma jogada para mostrar ao jogador"""
+    names = {STOCK: "stock", WASTE: "descarte"}
+    names.update({pile_id: f"fundação {i + 1}" for i, pile_id in enumerate(FOUNDATIONS)})
+    names.update({pile_id: f"coluna {i + 1}" for i, pile_id in enumerate(TABLEAU)})
+    if move.flip:
+        return f"Virar a carta da {names[move.src]}"
+    if move.src == STOCK:
+        return "Tirar uma carta do stock"
+    if move.dst == STOCK:
+        return "Voltar a pôr o descarte no stock"
+    return f"Mover {move.count} carta(s) da {names[move.src]} para a {names[move.dst]}"
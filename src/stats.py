@@ -0,0 +1,139 @@
+"""Estatísticas dos jogadores e tabela de classificação.
+
+Cada jogador tem uma linha com os totais (jogos, vitórias, melhor score,
+vitória mais rápida, sequência de vitórias atual e melhor), atualizada uma
+vez no fim de cada jogo por um só UPSERT; o histórico nunca é relido.
+
+Opcional, como store.py: só é usado com SOLITAIRE_STATS=<ficheiro.db>. A
+tabela tem um índice para a classificação (mais vitórias, depois a vitória
+mais rápida), por isso o ecrã das estatísticas abre sempre em tempo
+constante. O melhor score não entra na classificação: jogar ao acaso já
+dá pontos.
+
+As escritas correm numa thread própria, fora dos handlers dos eventos.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STATS_PATH = os.environ.get("SOLITAIRE_STATS", "")
+LEADERBOARD_SIZE = 10
+
+COLUMNS = ("name", "games", "wins", "best_score", "fastest_win", "streak", "best_streak", "total_score")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    player TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    best_score INTEGER NOT NULL,
+    fastest_win REAL,
+    streak INTEGER NOT NULL,
+    best_streak INTEGER NOT NULL,
+    total_score INTEGER NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS players_ranking ON players (wins DESC, fastest_win);
+"""
+
+# Os valores antigos da linha são os que aparecem do lado direito de cada SET
+UPSERT = """
+INSERT INTO players (player, name, games, wins, best_score, fastest_win, streak, best_streak, total_score, updated)
+VALUES (:player, :name, 1, :won, :score, :fastest_win, :won, :won, :score, :updated)
+ON CONFLICT (player) DO UPDATE SET
+    games = games + 1,
+    wins = wins + excluded.wins,
+    best_score = MAX(best_score, excluded.best_score),
+    fastest_win = CASE
+        WHEN excluded.fastest_win IS NULL THEN fastest_win
+        WHEN fastest_win IS NULL THEN excluded.fastest_win
+        ELSE MIN(fastest_win, excluded.fastest_win)
+    END,
+    streak = CASE WHEN excluded.wins THEN streak + 1 ELSE 0 END,
+    best_streak = MAX(best_streak, CASE WHEN excluded.wins THEN streak + 1 ELSE 0 END),
+    total_score = total_score + excluded.total_score,
+    updated = excluded.updated
+"""
+
+
+def player_id(token):
+    """Identificador guardado na tabela; o token do jogador nunca é guardado nem mostrado"""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def player_name(token):
+    return f"Jogador {player_id(token)[:6]}"
+
+
+class StatsStore:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stats")
+
+    def record_game(self, token, won, score, seconds):
+        """Regista o fim de um jogo; devolve logo (a escrita é feita pela thread das estatísticas)"""
+        row = {
+            "player": player_id(token),
+            "name": player_name(token),
+            "won": int(won),
+            "score": score,
+            "fastest_win": round(seconds, 1) if won else None,
+            "updated": time.time(),
+        }
+        return self.writer.submit(self.write, row)
+
+    def write(self, row):
+        with self.lock:
+            try:
+                with self.db:
+                    self.db.execute(UPSERT, row)
+            except sqlite3.Error as e:
+                print(f"Erro ao guardar as estatísticas: {e!r}")
+
+    def player(self, token):
+        """Totais do jogador (dicionário), ou None se ainda não terminou nenhum jogo"""
+        with self.lock:
+            row = self.db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM players WHERE player = ?", (player_id(token),)
+            ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def leaderboard(self, limit=LEADERBOARD_SIZE):
+        """Os jogadores com mais vitórias e, entre esses, a vitória mais rápida, lidos pelo índice"""
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM players WHERE wins > 0"
+                " ORDER BY wins DESC, fastest_win LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def close(self):
+        self.writer.shutdown(wait=True)
+        self.db.close()
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_stats():
+    """Estatísticas partilhadas pelo processo, ou None se SOLITAIRE_STATS não estiver definido"""
+    global _stats
+    if not STATS_PATH:
+        return None
+    with _stats_lock:
+        if _stats is None:
+            _stats = StatsStore(STATS_PATH)
+    return _stats
@@ -0,0 +1,114 @@
+"""Jogos guardados no servidor, numa base SQLite local.
+
+Opcional: só é usado com SOLITAIRE_STORE=<ficheiro.db>. Sem isso o jogo é
+guardado no armazenamento do cliente, como antes.
+
+As escritas não esperam pelo disco: put() guarda o jogo num dicionário e uma
+thread escreve tudo o que se juntou de STORE_FLUSH_INTERVAL em
+STORE_FLUSH_INTERVAL segundos, numa só transação (várias gravações da mesma
+chave ficam só a última). get() lê primeiro o que ainda não foi escrito e
+depois a tabela, pela chave primária.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+STORE_PATH = os.environ.get("SOLITAIRE_STORE", "")
+STORE_FLUSH_INTERVAL = 0.5  # segundos
+
+
+class GameStore:
+    def __init__(self, path, flush_interval=STORE_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.pending = {}  # chave -> (jogo, hora), ainda por escrever
+        self.writing = {}  # o lote que a thread está a escrever
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closed = False
+        self.reader = self.connect()
+        self.reader_lock = threading.Lock()
+        self.writer = threading.Thread(target=self.run, name="store-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")  # as leituras não esperam pelas escritas
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS games (key TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)"
+            " WITHOUT ROWID"
+        )
+        db.commit()
+        return db
+
+    def put(self, key, state):
+        with self.lock:
+            self.pending[key] = (state, time.time())
+
+    def get(self, key):
+        with self.lock:
+            entry = self.pending.get(key) or self.writing.get(key)
+        if entry is not None:
+            return entry[0]
+        with self.reader_lock:
+            row = self.reader.execute("SELECT state FROM games WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def run(self):
+        db = self.connect()
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.flush(db)
+        self.flush(db)
+        db.close()
+
+    def flush(self, db):
+        with self.lock:
+            if not self.pending:
+                return 0
+            self.writing, self.pending = self.pending, {}
+        try:
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO games (key, state, updated) VALUES (?, ?, ?)",
+                    [(key, state, updated) for key, (state, updated) in self.writing.items()],
+                )
+        except sqlite3.Error as e:
+            print(f"Erro ao guardar {len(self.writing)} jogos: {e!r}")
+            with self.lock:
+                # Volta a tentar no próximo ciclo, sem apagar gravações mais recentes
+                self.pending = {**self.writing, **self.pending}
+        finally:
+            with self.lock:
+                count = len(self.writing)
+                self.writing = {}
+        return count
+
+    def close(self):
+        """Escreve o que falta e pára a thread"""
+        if self.closed:
+            return
+        self.closed = True
+        self.wake.set()
+        self.writer.join()
+        self.reader.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Store partilhado pelo processo, ou None se SOLITAIRE_STORE não estiver definido"""
+    global _store
+    if not STORE_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = GameStore(STORE_PATH)
+    return _store
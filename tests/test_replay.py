@@ -0,0 +1,68 @@
+"""Uma gravação exportada reproduz o jogo até à mesma posição."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from benchmark import mounted_game  # noqa: E402
+from model import FACE_UP, STOCK, TABLEAU, WASTE  # noqa: E402
+from recording import GameRecord  # noqa: E402
+
+
+def uncovering_move(solitaire):
+    """Jogada do tableau que deixa uma carta virada para baixo no topo da coluna"""
+    state = solitaire.state
+    for move in solitaire.move_generator.moves():
+        if move.src in TABLEAU and not move.flip:
+            below = len(state.piles[move.src]) - move.count - 1
+            if below >= 0 and not state.piles[move.src][below] & FACE_UP:
+                return move
+    return None
+
+
+def play_until_face_down_top(solitaire, max_moves=200):
+    for _ in range(max_moves):
+        move = uncovering_move(solitaire)
+        if move is not None:
+            solitaire.apply_moves([move])
+            return True
+        stock_moves = [move for move in solitaire.move_generator.moves() if move.src in (STOCK, WASTE)]
+        if not stock_moves:
+            return False
+        solitaire.apply_moves([stock_moves[0]])
+    return False
+
+
+def replayed_state(solitaire):
+    _, replay = mounted_game(track_payload=False)
+    replay.replay(GameRecord.decode(solitaire.recording.encode()), speed=None)
+    return replay.state
+
+
+def test_replay_after_hibernation_with_face_down_top():
+    _, solitaire = mounted_game(track_payload=False)
+    for seed in range(50):
+        solitaire.deal_cards(seed)
+        if play_until_face_down_top(solitaire):
+            break
+    else:
+        raise AssertionError("nenhuma distribuição deixou uma carta virada para baixo no topo")
+
+    solitaire.hibernate()
+    solitaire.resume()
+    assert all(not pile or pile[-1] & FACE_UP for pile in (solitaire.state.piles[i] for i in TABLEAU))
+
+    solitaire.apply_moves([solitaire.move_generator.moves()[0]])
+    assert replayed_state(solitaire) == solitaire.state
+
+
+def test_replay_with_undo_and_redo():
+    _, solitaire = mounted_game(track_payload=False)
+    solitaire.deal_cards(7)
+    for _ in range(20):
+        solitaire.apply_moves([solitaire.move_generator.moves()[0]])
+    solitaire.undo_move(None)
+    solitaire.undo_move(None)
+    solitaire.redo_move(None)
+    assert replayed_state(solitaire) == solitaire.state